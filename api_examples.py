@@ -5,10 +5,11 @@ Shows how to use SmartSurveillance programmatically without the GUI
 
 from src.orchestrator import SurveillanceOrchestrator
 from src.config import ConfigManager
+from src import logging_setup
 import logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging_setup.configure(fmt='%(levelname)s:%(name)s:%(message)s')
 logger = logging.getLogger(__name__)
 
 
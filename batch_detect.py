@@ -5,28 +5,55 @@ Batch detection for Pictures folder
 import logging
 import cv2
 import os
-from pathlib import Path
+import threading
+from queue import Queue, Empty
 from src.object_detector import ObjectDetector
+from src import logging_setup
+from src.utils import fast_imread
 
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+logging_setup.configure(fmt='%(message)s')
 logger = logging.getLogger(__name__)
 
 # Folder path
 folder_path = r"C:\Users\ELCOT\OneDrive\Pictures"
 
+# Images sent to the model per call, as many as the TensorRT engine takes
+BATCH_SIZE = ObjectDetector.MAX_BATCH
+
+# Pipeline sizing: reader threads -> detector -> writer threads.
+# Threads rather than processes: OpenCV releases the GIL while decoding,
+# drawing and encoding, and processes would have to pickle every image.
+NUM_READERS = 4
+NUM_WRITERS = os.cpu_count() or 4
+QUEUE_SIZE = 32
+
+# Encoder settings: plain baseline JPEG at q90, fastest PNG compression
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 90, cv2.IMWRITE_JPEG_OPTIMIZE, 0, cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+# Each worker thread decodes/encodes on its own; keep OpenCV from spawning more
+cv2.setNumThreads(1)
+
 # Verify folder exists
 if not os.path.isdir(folder_path):
     logger.error(f"Folder not found: {folder_path}")
     exit(1)
 
 # Find all images
-image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
-image_files = []
-for ext in image_extensions:
-    image_files.extend(Path(folder_path).rglob(f"*{ext}"))
-    image_files.extend(Path(folder_path).rglob(f"*{ext.upper()}"))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
 
-image_files = list(set(image_files))  # Remove duplicates
+def iter_images(root):
+    """Yield image paths under root in a single directory walk"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_images(entry.path)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path
+
+
+image_files = list(iter_images(folder_path))
 
 if not image_files:
     logger.info(f"No images found in {folder_path}")
@@ -38,28 +65,100 @@ logger.info(f"Found {len(image_files)} images")
 logger.info("Initializing detector...")
 detector = ObjectDetector(model_name="yolov8n.pt")
 
-# Process each image
+path_q = Queue()
+for img_path in image_files:
+    path_q.put(img_path)
+read_q = Queue(maxsize=QUEUE_SIZE)
+write_q = Queue(maxsize=QUEUE_SIZE)
+
+
+def reader():
+    """Decode images from disk and hand them to the detector"""
+    while True:
+        try:
+            img_path = path_q.get_nowait()
+        except Empty:
+            break
+        read_q.put((img_path, fast_imread(img_path)))
+    read_q.put(None)  # One end marker per reader
+
+
+def encode_params(path):
+    """Pick encoder parameters from the output file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        return JPEG_PARAMS
+    if ext == '.png':
+        return PNG_PARAMS
+    return []
+
+
+def writer():
+    """Draw detections and encode annotated images back to disk"""
+    while True:
+        item = write_q.get()
+        if item is None:
+            break
+        output_path, image, detections = item
+        result_image = detector.draw_detections(image, detections, inplace=True)
+        cv2.imwrite(output_path, result_image, encode_params(output_path))
+
+
+readers = [threading.Thread(target=reader, daemon=True) for _ in range(NUM_READERS)]
+writers = [threading.Thread(target=writer, daemon=True) for _ in range(NUM_WRITERS)]
+for t in readers + writers:
+    t.start()
+
+# Detector stage (inference only): pull batches off the read queue until every reader is done
 total_detections = 0
-for idx, img_path in enumerate(image_files, 1):
-    logger.info(f"\n[{idx}/{len(image_files)}] Processing: {img_path.name}")
+processed = 0
+finished_readers = 0
+while finished_readers < NUM_READERS:
+    batch_paths = []
+    batch_images = []
     
-    image = cv2.imread(str(img_path))
-    if image is None:
-        logger.warning(f"  Could not read image")
-        continue
+    # Block for the first item, then take whatever else is already decoded
+    item = read_q.get()
+    while True:
+        if item is None:
+            finished_readers += 1
+        else:
+            img_path, image = item
+            processed += 1
+            logger.info(f"\n[{processed}/{len(image_files)}] Processing: {os.path.basename(img_path)}")
+            if image is None:
+                logger.warning(f"  Could not read image")
+            else:
+                batch_paths.append(img_path)
+                batch_images.append(image)
+        
+        if len(batch_images) >= BATCH_SIZE or finished_readers == NUM_READERS:
+            break
+        try:
+            item = read_q.get_nowait()
+        except Empty:
+            break
     
-    # Run detection
-    detections = detector.detect(image)
-    total_detections += len(detections)
+    # Run detection on the whole batch at once
+    batch_detections = detector.detect_batch(batch_images)
     
-    logger.info(f"  Detections: {len(detections)}")
-    for det in detections:
-        logger.info(f"    - {det.class_name}: {det.confidence:.1%}")
-    
-    # Draw and save
-    result_image = detector.draw_detections(image, detections)
-    output_path = str(img_path).replace(str(img_path)[-4:], "_detected" + str(img_path)[-4:])
-    cv2.imwrite(output_path, result_image)
+    for img_path, image, detections in zip(batch_paths, batch_images, batch_detections):
+        total_detections += len(detections)
+        
+        logger.info(f"  {os.path.basename(img_path)} detections: {len(detections)}")
+        for det in detections:
+            logger.info(f"    - {det.class_name}: {det.confidence:.1%}")
+        
+        # Drawing and saving happen on the writer threads
+        root, ext = os.path.splitext(img_path)
+        output_path = f"{root}_detected{ext}"
+        write_q.put((output_path, image, detections))
+
+# Let the writers drain the queue before reporting
+for _ in writers:
+    write_q.put(None)
+for t in writers:
+    t.join()
 
 logger.info(f"\n{'='*50}")
 logger.info(f"Batch processing complete!")
@@ -3,20 +3,64 @@ Console-based example of SmartSurveillance system
 Run this for command-line usage without PyQt GUI
 """
 
+import asyncio
 import logging
-import time
+import signal
 import sys
 from src.orchestrator import SurveillanceOrchestrator
 from src.config import ConfigManager
+from src import logging_setup
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logging_setup.configure()
 logger = logging.getLogger(__name__)
 
 
+async def grab_task(orchestrator, frame_queue):
+    """Capture frames in a worker thread and queue them for detection"""
+    while orchestrator.is_running:
+        # Waits for a frame we haven't seen yet, so no frame is detected twice
+        frame = await asyncio.to_thread(orchestrator.capture_frame, 0.5)
+        
+        if frame is None:
+            continue
+        
+        # The grabber only protects the frame it handed out last, and up to three
+        # frames are in flight here; queue a private copy
+        await frame_queue.put(frame.copy())
+
+
+async def detect_task(orchestrator, frame_queue, on_result):
+    """Run detection on queued frames in a worker thread"""
+    while orchestrator.is_running:
+        frame = await frame_queue.get()
+        detections = await asyncio.to_thread(orchestrator.detect_on_frame, frame)
+        on_result(frame, detections)
+
+
+async def run_live(orchestrator, on_result):
+    """
+    Run capture and detection as two tasks so the next frame is grabbed
+    while the current one is being detected
+    """
+    frame_queue = asyncio.Queue(maxsize=2)
+    tasks = [
+        asyncio.create_task(grab_task(orchestrator, frame_queue)),
+        asyncio.create_task(detect_task(orchestrator, frame_queue, on_result)),
+    ]
+    
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, lambda: [t.cancel() for t in tasks])
+    except NotImplementedError:
+        pass  # Windows: Ctrl+C surfaces as KeyboardInterrupt instead
+    
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        logger.info("Stopping system...")
+
+
 def main():
     """Run SmartSurveillance in console mode"""
     
@@ -36,11 +80,18 @@ def main():
         alert_frame_dir=config_manager.detection.alert_frame_dir
     )
     
+    # Video files are decoded by the detector's streaming predictor, which
+    # overlaps reading and inference; live cameras keep the frame grabber
+    source = config_manager.camera.source
+    stream_file = isinstance(source, str)
+    
     # Initialize system
     logger.info("Initializing surveillance system...")
     if not orchestrator.initialize(
-        camera_source=config_manager.camera.source,
-        model_name=config_manager.detection.model_name
+        camera_source=source,
+        model_name=config_manager.detection.model_name,
+        use_frame_grabber=not stream_file,
+        camera_config=config_manager.camera
     ):
         logger.error("Failed to initialize system")
         return 1
@@ -57,25 +108,27 @@ def main():
     orchestrator.start()
     logger.info("System started. Press Ctrl+C to stop.")
     
+    frame_count = 0
+    
+    def log_result(frame, detections):
+        nonlocal frame_count
+        frame_count += 1
+        
+        # Log detections every second
+        if frame_count % 30 == 0:
+            if detections:
+                logger.info(f"Frame {frame_count}: {len(detections)} object(s) detected")
+                for det in detections:
+                    logger.info(f"  - {det.class_name} ({det.confidence:.2%})")
+            else:
+                logger.debug("Frame %d: No detections", frame_count)
+    
     try:
-        frame_count = 0
-        while orchestrator.is_running:
-            frame, detections = orchestrator.process_frame()
-            
-            if frame is None:
-                time.sleep(0.01)
-                continue
-            
-            frame_count += 1
-            
-            # Log detections every second
-            if frame_count % 30 == 0:
-                if detections:
-                    logger.info(f"Frame {frame_count}: {len(detections)} object(s) detected")
-                    for det in detections:
-                        logger.info(f"  - {det.class_name} ({det.confidence:.2%})")
-                else:
-                    logger.debug(f"Frame {frame_count}: No detections")
+        if stream_file:
+            for frame, detections in orchestrator.process_stream(source):
+                log_result(frame, detections)
+        else:
+            asyncio.run(run_live(orchestrator, log_result))
     
     except KeyboardInterrupt:
         logger.info("Stopping system...")
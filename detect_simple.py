@@ -6,16 +6,18 @@ import sys
 import logging
 import cv2
 import os
+from pathlib import Path
 from src.object_detector import ObjectDetector
+from src import logging_setup
 
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+logging_setup.configure(fmt='%(message)s')
 logger = logging.getLogger(__name__)
 
 # Get image path from argument or use default
 if len(sys.argv) > 1:
-    image_path = sys.argv[1]
+    image_path = Path(sys.argv[1])
 else:
-    image_path = r"C:\Users\ELCOT\OneDrive\Documents\New folder\BMW.jpg"
+    image_path = Path(r"C:\Users\ELCOT\OneDrive\Documents\New folder\BMW.jpg")
 
 # Verify file exists
 if not os.path.exists(image_path):
@@ -23,7 +25,7 @@ if not os.path.exists(image_path):
     sys.exit(1)
 
 logger.info(f"Loading: {image_path}")
-image = cv2.imread(image_path)
+image = cv2.imread(str(image_path))
 
 if image is None:
     logger.error(f"Could not read image from {image_path}")
@@ -46,6 +48,6 @@ for i, det in enumerate(detections, 1):
 
 # Draw and save
 result_image = detector.draw_detections(image, detections)
-output_path = image_path.replace(image_path[-4:], "_detected" + image_path[-4:])
-cv2.imwrite(output_path, result_image)
+output_path = image_path.with_name(image_path.stem + "_detected" + image_path.suffix)
+cv2.imwrite(str(output_path), result_image)
 logger.info(f"\nSaved: {output_path}")
@@ -10,10 +10,10 @@ from src.object_detector import ObjectDetector
 detector = ObjectDetector(confidence_threshold=0.5)
 
 # Image path - saved from attachment
-image_path = "uploaded_image.jpg"
+image_path = Path("uploaded_image.jpg")
 
 print(f"Loading image: {image_path}")
-frame = cv2.imread(image_path)
+frame = cv2.imread(str(image_path))
 
 if frame is None:
     print(f"Error: Failed to load image: {image_path}")
@@ -43,8 +43,8 @@ else:
 output_frame = detector.draw_detections(frame, detections)
 
 # Save output
-output_path = "uploaded_image_detected.jpg"
-cv2.imwrite(output_path, output_frame)
+output_path = image_path.with_name(image_path.stem + "_detected" + image_path.suffix)
+cv2.imwrite(str(output_path), output_frame)
 print(f"Output saved: {output_path}")
 
 print(f"{'='*60}\n")
@@ -8,18 +8,16 @@ import cv2
 from PIL import Image, ImageTk
 import threading
 import logging
+import queue
+import time
+from dataclasses import replace
 from pathlib import Path
 from src.object_detector import ObjectDetector
+from src.video_source import VideoSource
+from src import logging_setup
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('gui_app.log'),
-        logging.StreamHandler()
-    ]
-)
+logging_setup.configure(log_file='gui_app.log')
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +34,26 @@ class SmartSurveillanceGUI:
         self.is_running = False
         self.video_source = 0
         self.current_frame = None
+        self.target_inference_fps = 10  # Frames per second actually sent to the detector
+        self.frame_skip = 1
+        self.frame_interval = 1.0 / 30
+        self.max_stale_grabs = 5  # Upper bound on frames dropped per read on a live camera
+        
+        # Pipeline: capture thread -> cap_q -> detection thread -> det_q -> Tk thread
+        self.cap_q = queue.Queue(maxsize=2)
+        self.det_q = queue.Queue(maxsize=1)  # Only the newest result is ever rendered
+        self.capture_thread = None
+        self.detection_thread = None
+        self.frame_count = 0
+        self.total_objects = 0
+        self.ui_update_interval = 0.25  # Seconds between detection/stats text refreshes
+        self.render_interval_ms = 33  # Canvas refresh period (~30 Hz), independent of detector FPS
+        self._ui_last_update = 0.0
+        
+        # Display buffers, reused across frames
+        self.canvas_size = (900, 600)
+        self._display_photo = None
+        self._canvas_img_id = None
         
         # Setup UI
         self.setup_ui()
@@ -59,6 +77,7 @@ class SmartSurveillanceGUI:
         # Video canvas
         self.video_canvas = tk.Canvas(left_panel, bg="black", width=900, height=600)
         self.video_canvas.pack(fill=tk.BOTH, expand=True)
+        self.video_canvas.bind("<Configure>", self.on_canvas_resize)
         
         # Right panel - Controls
         right_panel = ttk.Frame(main_frame, width=300)
@@ -225,19 +244,44 @@ class SmartSurveillanceGUI:
                 )
             
             # Open video capture
-            self.cap = cv2.VideoCapture(self.video_source)
+            self.cap = VideoSource(self.video_source)
             if not self.cap.isOpened():
                 messagebox.showerror("Error", "Failed to open video source!")
                 return
             
+            if self.video_source == 0:
+                # Keep the driver queue short so live frames are not stale
+                if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+                    logger.warning("Camera backend ignored CAP_PROP_BUFFERSIZE; stale frames will be drained instead")
+            
+            # Only decode the frames the detector can keep up with
+            cap_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            if cap_fps > 0:
+                self.frame_skip = max(1, int(cap_fps // self.target_inference_fps))
+                self.frame_interval = 1.0 / cap_fps
+            else:
+                self.frame_skip = 1
+                self.frame_interval = 1.0 / 30
+            logger.info(f"Source FPS: {cap_fps:.1f}, decoding 1 of every {self.frame_skip} frames")
+            
             self.is_running = True
+            self.frame_count = 0
+            self.total_objects = 0
+            self.cap_q = queue.Queue(maxsize=2)
+            self.det_q = queue.Queue(maxsize=1)
             self.start_btn.config(state=tk.DISABLED)
             self.stop_btn.config(state=tk.NORMAL)
             self.status_label.config(text="Status: Running")
             
-            # Start detection thread
-            detection_thread = threading.Thread(target=self.detection_loop, daemon=True)
-            detection_thread.start()
+            # Start capture and detection threads; results are shown from the Tk thread.
+            # Each session's threads and render chain get that session's queues, so
+            # leftovers of a previous session can't touch the new one.
+            self.capture_thread = threading.Thread(target=self.capture_loop, args=(self.cap_q,), daemon=True)
+            self.capture_thread.start()
+            self.detection_thread = threading.Thread(target=self.detection_loop,
+                                                     args=(self.cap_q, self.det_q), daemon=True)
+            self.detection_thread.start()
+            self.root.after(self.render_interval_ms, self.render_tick, self.det_q)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start detection: {str(e)}")
@@ -246,6 +290,14 @@ class SmartSurveillanceGUI:
     def stop_detection(self):
         """Stop detection"""
         self.is_running = False
+        if self.capture_thread is not None:
+            # Don't release the device while the capture thread is still reading it
+            self.capture_thread.join(timeout=1.0)
+            self.capture_thread = None
+        if self.detection_thread is not None:
+            # Let a running detect finish so a restart never shares the model with it
+            self.detection_thread.join(timeout=5.0)
+            self.detection_thread = None
         if self.cap:
             self.cap.release()
         
@@ -255,85 +307,185 @@ class SmartSurveillanceGUI:
         
         logger.info("Detection stopped")
     
-    def detection_loop(self):
-        """Main detection loop running in separate thread"""
-        frame_count = 0
-        total_objects = 0
-        
+    @staticmethod
+    def put_latest(q, item):
+        """Put an item on a bounded queue, dropping the oldest entry when full"""
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def capture_loop(self, cap_q: queue.Queue):
+        """Read frames in a separate thread so decoding overlaps detection"""
+        # Video files are played back at their own frame rate; a live camera
+        # already blocks in grab() until the next frame arrives.
+        is_file = self.video_source != 0
+        target_dt = self.frame_interval * self.frame_skip
         try:
-            while self.is_running:
-                ret, frame = self.cap.read()
+            while self.is_running and cap_q is self.cap_q:
+                start = time.monotonic()
+                ret, frame = self.read_frame()
                 if not ret:
                     break
+                self.put_latest(cap_q, frame)
                 
-                frame_count += 1
-                
-                # Run detection
-                detections = self.detector.detect(frame)
-                total_objects += len(detections)
+                if is_file:
+                    time.sleep(max(0.0, target_dt - (time.monotonic() - start)))
+        except Exception as e:
+            logger.error(f"Error in capture loop: {e}")
+        finally:
+            self.put_latest(cap_q, None)  # End of stream
+    
+    def detection_loop(self, cap_q: queue.Queue, det_q: queue.Queue):
+        """Detection loop running in separate thread"""
+        try:
+            while self.is_running and cap_q is self.cap_q:
+                try:
+                    frame = cap_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    break
                 
-                # Draw detections
-                output_frame = self.detector.draw_detections(frame, detections)
+                self.frame_count += 1
                 
-                # Add frame info
-                info_text = f"Frame: {frame_count} | Detections: {len(detections)}"
-                cv2.putText(output_frame, info_text, (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                # Run detection
+                detections = self.detector.detect_gated(frame)
+                self.total_objects += len(detections)
                 
-                # Update canvas
-                self.display_frame(output_frame)
+                self.put_latest(det_q, (frame, detections, self.frame_count, self.total_objects))
+        
+        except Exception as e:
+            logger.error(f"Error in detection loop: {e}")
+        
+        finally:
+            self.put_latest(det_q, None)  # Tell the Tk thread we are done
+    
+    def render_tick(self, det_q: queue.Queue):
+        """Render the newest detection result at a fixed rate; runs on the Tk main thread"""
+        if det_q is not self.det_q:
+            return  # A newer session has its own render chain
+        
+        item = False
+        try:
+            while True:
+                item = det_q.get_nowait()
+                if item is None:
+                    break
+        except queue.Empty:
+            pass
+        
+        if item is None:
+            # Stream ended or detection failed
+            if self.is_running:
+                self.stop_detection()
+            return
+        
+        if item is not False:
+            frame, detections, frame_count, total_objects = item
+            
+            # Shrink to the canvas first so boxes are drawn on display-sized pixels
+            small, scale = self.fit_to_canvas(frame)
+            if scale != 1.0:
+                shown = [replace(d, bbox=tuple(int(v * scale) for v in d.bbox)) for d in detections]
+            else:
+                shown = detections
+            
+            # Draw detections and frame info in one pass
+            info_text = f"Frame: {frame_count} | Detections: {len(detections)}"
+            output_frame = self.detector.draw_detections(small, shown, info_text, inplace=True)
+            
+            # Update canvas
+            self.display_frame(output_frame)
+            
+            # Update detection info a few times a second, not every frame
+            now = time.monotonic()
+            if now - self._ui_last_update >= self.ui_update_interval:
+                self._ui_last_update = now
                 
-                # Update detection info
                 detection_info = f"Frame: {frame_count}\nDetections: {len(detections)}\n"
-                for det in detections:
-                    detection_info += f"  • {det.class_name}: {det.confidence:.2f}\n"
+                detection_info += "\n".join(f"  • {d.class_name}: {d.confidence:.2f}" for d in detections)
+                mean_conf = sum(d.confidence for d in detections) / len(detections) if detections else 0.0
                 
                 self.update_detection_text(detection_info)
-                self.update_stats(f"Frames: {frame_count}\nObjects: {total_objects}\nAvg Confidence: {sum(d.confidence for d in detections) / len(detections) if detections else 0:.2f}")
-                
-                # Small delay to prevent CPU overload
-                cv2.waitKey(1)
+                self.update_stats(f"Frames: {frame_count}\nObjects: {total_objects}\nAvg Confidence: {mean_conf:.2f}")
         
-        except Exception as e:
-            logger.error(f"Error in detection loop: {e}")
+        if self.is_running:
+            self.root.after(self.render_interval_ms, self.render_tick, det_q)
+    
+    def read_frame(self):
+        """Read the next frame for detection, skipping frames without decoding them"""
+        if self.video_source == 0:
+            # Live camera: drop whatever queued up while the detector was busy.
+            # Queued frames come back almost instantly; once a grab has to wait
+            # for the sensor the driver buffer is empty and the frame is current.
+            for _ in range(self.max_stale_grabs):
+                start = time.monotonic()
+                if not self.cap.grab():
+                    return False, None
+                if time.monotonic() - start >= self.frame_interval / 2:
+                    break
+            return self.cap.retrieve()
         
-        finally:
-            self.is_running = False
-            self.stop_btn.config(state=tk.DISABLED)
-            self.start_btn.config(state=tk.NORMAL)
-            self.status_label.config(text="Status: Stopped")
+        # grab() only advances the stream; retrieve() decodes the last grabbed frame
+        for _ in range(self.frame_skip):
+            if not self.cap.grab():
+                return False, None
+        return self.cap.retrieve()
+    
+    def on_canvas_resize(self, event):
+        """Remember the canvas size and keep the video centred"""
+        if event.width > 1 and event.height > 1:
+            self.canvas_size = (event.width, event.height)
+            if self._canvas_img_id is not None:
+                self.video_canvas.coords(self._canvas_img_id, event.width // 2, event.height // 2)
+    
+    def fit_to_canvas(self, frame):
+        """
+        Resize a frame to fit the canvas, keeping its aspect ratio
+        
+        Returns:
+            Tuple of (resized frame, scale factor)
+        """
+        h, w = frame.shape[:2]
+        canvas_w, canvas_h = self.canvas_size
+        scale = min(canvas_w / w, canvas_h / h)
+        new_w, new_h = int(w * scale), int(h * scale)
+        
+        if (new_w, new_h) == (w, h):
+            return frame, 1.0
+        return cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR), scale
     
     def display_frame(self, frame):
         """Display frame on canvas"""
         try:
-            # Resize frame to fit canvas
-            h, w = frame.shape[:2]
-            canvas_w = self.video_canvas.winfo_width()
-            canvas_h = self.video_canvas.winfo_height()
+            # No-op when the frame was already fitted by the caller
+            frame, _ = self.fit_to_canvas(frame)
+            new_h, new_w = frame.shape[:2]
+            canvas_w, canvas_h = self.canvas_size
             
-            if canvas_w <= 1 or canvas_h <= 1:
-                canvas_w, canvas_h = 900, 600
+            # Pillow unpacks BGR straight into RGB, no separate cvtColor pass
+            img = Image.frombuffer('RGB', (new_w, new_h), frame, 'raw', 'BGR', 0, 1)
             
-            # Calculate aspect ratio
-            aspect = w / h
-            if canvas_w / canvas_h > aspect:
-                new_w = int(canvas_h * aspect)
-                new_h = canvas_h
-            else:
-                new_w = canvas_w
-                new_h = int(canvas_w / aspect)
-            
-            frame = cv2.resize(frame, (new_w, new_h))
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PhotoImage
-            img = Image.fromarray(frame)
-            photo = ImageTk.PhotoImage(img)
+            photo = self._display_photo
+            if photo is not None and photo.width() == new_w and photo.height() == new_h:
+                # Same size as last frame: copy pixels into the existing image
+                photo.paste(img)
+                return
             
-            # Update canvas
-            self.video_canvas.delete("all")
-            self.video_canvas.create_image(canvas_w // 2, canvas_h // 2, image=photo)
-            self.video_canvas.image = photo
+            # First frame or size changed: (re)create the PhotoImage and canvas item
+            self._display_photo = ImageTk.PhotoImage(img)
+            if self._canvas_img_id is None:
+                self._canvas_img_id = self.video_canvas.create_image(
+                    canvas_w // 2, canvas_h // 2, image=self._display_photo)
+            else:
+                self.video_canvas.itemconfig(self._canvas_img_id, image=self._display_photo)
+                self.video_canvas.coords(self._canvas_img_id, canvas_w // 2, canvas_h // 2)
         
         except Exception as e:
             logger.error(f"Error displaying frame: {e}")
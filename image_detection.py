@@ -5,28 +5,39 @@ import os
 import logging
 from pathlib import Path
 from src.object_detector import ObjectDetector
+from src.config import ConfigManager
+from src.utils import fast_imread, prefetch_images, save_image
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Folder mode decodes images on a thread pool; avoid oversubscribing with OpenCV's own threads
+cv2.setNumThreads(0)
 
-def process_image(image_path: str, detector: ObjectDetector) -> bool:
+
+def process_image(image_path: str, detector: ObjectDetector, frame=None,
+                  fast_preview: bool = False, display: bool = True) -> bool:
     """
     Process a single image and display results
     
     Args:
         image_path: Path to the image file
         detector: ObjectDetector instance
+        frame: Already decoded image, to skip reading it again
+        fast_preview: Decode large images at reduced size (output is saved at that size)
+        display: Show the result and wait for a key press
         
     Returns:
         True if successful, False otherwise
     """
-    if not os.path.exists(image_path):
-        logger.error(f"Image not found: {image_path}")
-        return False
+    if frame is None:
+        if not os.path.exists(image_path):
+            logger.error(f"Image not found: {image_path}")
+            return False
+        
+        # Read image
+        frame = fast_imread(image_path, detector.input_size if fast_preview else None)
     
-    # Read image
-    frame = cv2.imread(image_path)
     if frame is None:
         logger.error(f"Failed to read image: {image_path}")
         return False
@@ -43,25 +54,29 @@ def process_image(image_path: str, detector: ObjectDetector) -> bool:
         logger.info(f"  - {det.class_name}: {det.confidence:.2f}")
     
     # Draw detections
-    output_frame = detector.draw_detections(frame, detections)
+    output_frame = detector.draw_detections(frame, detections, inplace=True)
     
     # Save result
-    output_path = image_path.replace('.', '_detected.')
-    cv2.imwrite(output_path, output_frame)
+    root, ext = os.path.splitext(image_path)
+    output_path = f"{root}_detected{ext}"
+    save_image(output_path, output_frame)
     logger.info(f"Saved result to: {output_path}")
     
     # Display (press any key to continue)
-    cv2.imshow("Detection Result", output_frame)
-    logger.info("Press any key to continue...")
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    if display:
+        cv2.imshow("Detection Result", output_frame)
+        logger.info("Press any key to continue...")
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
     
     return True
 
 
 def main():
     logger.info("Initializing object detector...")
-    detector = ObjectDetector(confidence_threshold=0.5)
+    config = ConfigManager().detection
+    detector = ObjectDetector.from_config(config)
+    min_side = detector.input_size if config.fast_preview else None
     
     # Ask user for image path
     print("\n" + "="*60)
@@ -76,7 +91,7 @@ def main():
     
     if choice == '1':
         image_path = input("Enter image path: ").strip()
-        process_image(image_path, detector)
+        process_image(image_path, detector, fast_preview=config.fast_preview)
         
     elif choice == '2':
         folder_path = input("Enter folder path: ").strip()
@@ -95,9 +110,11 @@ def main():
         
         logger.info(f"Found {len(image_files)} images to process")
         
-        for filename in image_files:
-            image_path = os.path.join(folder_path, filename)
-            process_image(image_path, detector)
+        # Next images decode in the background while the current one is processed;
+        # results are only saved, so the batch doesn't stop for a key press per image
+        image_paths = [os.path.join(folder_path, filename) for filename in image_files]
+        for image_path, frame in prefetch_images(image_paths, min_side=min_side):
+            process_image(image_path, detector, frame, display=False)
             
         logger.info("Batch processing complete!")
         
@@ -3,16 +3,10 @@
 import sys
 import os
 import logging
+from src import logging_setup
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('smartsurveillance.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging; file and console writes happen on a background listener thread
+logging_setup.configure(log_file='smartsurveillance.log')
 
 logger = logging.getLogger(__name__)
 
@@ -26,49 +20,77 @@ except ImportError as e:
     import cv2
     from pathlib import Path
     from src.object_detector import ObjectDetector
+    from src.frame_grabber import FrameGrabber
+    from src.config import ConfigManager
+    from src.utils import (exif_orientation, fast_imread, gpu_decode_jpegs, gpu_jpeg_available,
+                           prefetch_images, save_image, tensor_to_bgr)
+    
+    # Images are decoded on a thread pool; keep OpenCV from spawning its own threads on top
+    cv2.setNumThreads(0)
+
+
+_detector = None
+
+INFO_TEMPLATE = "Frame: {} | Detections: {}"
+
+
+def get_detector():
+    """Load the detector on first use and reuse it for later menu choices"""
+    global _detector
+    if _detector is None:
+        _detector = ObjectDetector.from_config(ConfigManager().detection)
+    return _detector
 
 
 def run_live_detection():
     """Run real-time detection from camera"""
     logger.info("Starting live detection from camera...")
-    detector = ObjectDetector(confidence_threshold=0.5)
+    detector = get_detector()
     
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    # Capture runs on the grabber's thread; each detection starts on the newest frame
+    camera = ConfigManager().camera
+    grabber = FrameGrabber(source=0, fps=camera.fps, fourcc=camera.fourcc,
+                           capture_buffersize=camera.buffersize)
+    if not grabber.open():
         logger.error("Failed to open camera!")
         return False
     
     logger.info("Camera opened. Detection running... (Press 'q' to quit)")
     frame_count = 0
+    out_buf = None  # Allocated on the first frame, then reused
+    
+    # Per-frame constants bound once instead of rebuilt every iteration
+    format_info = INFO_TEMPLATE.format
+    log_detections = logger.isEnabledFor(logging.INFO)
+    quit_key = ord('q')
     
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame = grabber.grab_latest()
             if not ret:
                 logger.error("Failed to read frame")
                 break
             
             frame_count += 1
-            detections = detector.detect(frame)
-            output_frame = detector.draw_detections(frame, detections)
+            detections = detector.detect_gated(frame)
             
-            info_text = f"Frame: {frame_count} | Detections: {len(detections)}"
-            cv2.putText(output_frame, info_text, (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            # Annotate into the same buffer every frame instead of a fresh copy
+            out_buf = detector.draw_detections_into(frame, detections, out_buf,
+                                                    format_info(frame_count, len(detections)))
+            output_frame = out_buf
             
             cv2.imshow("SmartSurveillance - Live Detection", output_frame)
             
-            if detections:
-                logger.info(f"Frame {frame_count}: {len(detections)} objects detected")
-                for det in detections:
-                    logger.info(f"  - {det.class_name}: {det.confidence:.2f}")
+            if detections and log_detections:
+                summary = ", ".join(f"{d.class_name}:{d.confidence:.2f}" for d in detections)
+                logger.info(f"Frame {frame_count}: {len(detections)} objects detected - {summary}")
             
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if cv2.waitKey(1) & 0xFF == quit_key:
                 logger.info("Live detection stopped by user")
                 break
     
     finally:
-        cap.release()
+        grabber.release()
         cv2.destroyAllWindows()
     
     return True
@@ -81,20 +103,23 @@ def run_image_detection(image_path: str):
         return False
     
     logger.info(f"Processing image: {image_path}")
-    detector = ObjectDetector(confidence_threshold=0.5)
+    detector = get_detector()
     
-    frame = cv2.imread(image_path)
+    # fast_preview decodes big photos near the model's input size instead of full resolution
+    min_side = detector.input_size if ConfigManager().detection.fast_preview else None
+    frame = fast_imread(image_path, min_side)
     if frame is None:
         logger.error(f"Failed to load image: {image_path}")
         return False
     
     logger.info(f"Image shape: {frame.shape}")
     detections = detector.detect(frame)
-    output_frame = detector.draw_detections(frame, detections)
+    output_frame = detector.draw_detections(frame, detections, inplace=True)
     
     # Save output
-    output_path = os.path.splitext(image_path)[0] + "_detected" + os.path.splitext(image_path)[1]
-    cv2.imwrite(output_path, output_frame)
+    root, ext = os.path.splitext(image_path)
+    output_path = f"{root}_detected{ext}"
+    save_image(output_path, output_frame)
     logger.info(f"Saved: {output_path}")
     
     logger.info(f"Detections: {len(detections)} objects found")
@@ -111,7 +136,11 @@ def run_batch_detection(folder_path: str):
         return False
     
     logger.info(f"Starting batch detection on folder: {folder_path}")
-    detector = ObjectDetector(confidence_threshold=0.5)
+    detector = get_detector()
+    batch_size = max(1, ConfigManager().detection.batch_size)
+    if batch_size > ObjectDetector.MAX_BATCH:
+        logger.warning(f"batch_size {batch_size} exceeds the engine limit, using {ObjectDetector.MAX_BATCH}")
+        batch_size = ObjectDetector.MAX_BATCH
     
     image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
     image_files = [f for f in Path(folder_path).rglob('*') 
@@ -120,29 +149,76 @@ def run_batch_detection(folder_path: str):
     logger.info(f"Found {len(image_files)} images to process")
     
     total_detections = 0
+    batch_frames, batch_paths = [], []
+    out_buf = None  # Reused while consecutive images share a size
     
-    for idx, image_path in enumerate(image_files, 1):
-        try:
-            frame = cv2.imread(str(image_path))
-            if frame is None:
+    def flush_batch(detect=detector.detect_batch, to_frame=None):
+        """Run one model call over the pending batch and save the results"""
+        nonlocal total_detections, out_buf
+        for (idx, image_path), frame, detections in zip(
+                batch_paths, batch_frames, detect(batch_frames)):
+            try:
+                total_detections += len(detections)
+                
+                # One log record per image instead of one per detection
+                line = f"[{idx}/{len(image_files)}] {image_path.name}: {len(detections)} objects"
+                if detections:
+                    line += " - " + ", ".join(f"{d.class_name}:{d.confidence:.2f}" for d in detections)
+                logger.info(line)
+                
+                if detections:
+                    if to_frame is not None:
+                        frame = to_frame(frame)
+                    out_buf = detector.draw_detections_into(frame, detections, out_buf)
+                    output_frame = out_buf
+                    output_path = str(image_path.parent / (image_path.stem + "_detected" + image_path.suffix))
+                    save_image(output_path, output_frame)
+            
+            except Exception as e:
+                logger.error(f"Error processing {image_path.name}: {e}")
+        
+        batch_frames.clear()
+        batch_paths.clear()
+    
+    # On CUDA, JPEGs are decoded by nvJPEG and stay on the GPU; only images
+    # with detections are copied back to be drawn and saved. nvJPEG ignores
+    # EXIF orientation, so rotated photos stay on the CPU path.
+    cpu_files = list(enumerate(image_files, 1))
+    gpu_files = []
+    if detector.gpu_preprocess and gpu_jpeg_available():
+        on_gpu = [f.suffix.lower() in ('.jpg', '.jpeg') and exif_orientation(f) == 1 for _, f in cpu_files]
+        gpu_files = [item for item, gpu in zip(cpu_files, on_gpu) if gpu]
+        cpu_files = [item for item, gpu in zip(cpu_files, on_gpu) if not gpu]
+    
+    for start in range(0, len(gpu_files), batch_size):
+        chunk = gpu_files[start:start + batch_size]
+        for (idx, image_path), image in zip(chunk, gpu_decode_jpegs([f for _, f in chunk], detector.device)):
+            if image is None:
                 logger.warning(f"[{idx}/{len(image_files)}] Skipped: {image_path.name}")
                 continue
-            
-            detections = detector.detect(frame)
-            total_detections += len(detections)
-            
-            logger.info(f"[{idx}/{len(image_files)}] {image_path.name}: {len(detections)} objects")
-            
-            if detections:
-                output_frame = detector.draw_detections(frame, detections)
-                output_path = str(image_path.parent / (image_path.stem + "_detected" + image_path.suffix))
-                cv2.imwrite(output_path, output_frame)
-                
-                for det in detections:
-                    logger.info(f"    - {det.class_name}: {det.confidence:.2f}")
+            batch_frames.append(image)
+            batch_paths.append((idx, image_path))
+        if batch_frames:
+            flush_batch(detector.detect_gpu_batch, tensor_to_bgr)
+    
+    cpu_indices = [idx for idx, _ in cpu_files]
+    for idx, (image_path, frame) in zip(cpu_indices, prefetch_images(f for _, f in cpu_files)):
+        if frame is None:
+            logger.warning(f"[{idx}/{len(image_files)}] Skipped: {image_path.name}")
+            continue
         
-        except Exception as e:
-            logger.error(f"Error processing {image_path.name}: {e}")
+        if detector.quick_reject(frame):
+            logger.info(f"[{idx}/{len(image_files)}] {image_path.name}: skipped (uniform image)")
+            continue
+        
+        batch_frames.append(frame)
+        batch_paths.append((idx, image_path))
+        if len(batch_frames) == batch_size:
+            flush_batch()
+    
+    # Last partial batch runs as-is
+    if batch_frames:
+        flush_batch()
     
     logger.info(f"Batch complete! Total detections: {total_detections} across {len(image_files)} images")
     return True
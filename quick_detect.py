@@ -1,9 +1,13 @@
 """Quick image detection script with command line argument"""
 
 import cv2
+import os
 import sys
 import logging
 from src.object_detector import ObjectDetector
+from src.config import ConfigManager
+from src.utils import fast_imread, save_image
+from src.detection_server import request_detection
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,22 +19,36 @@ if len(sys.argv) < 2:
 image_path = sys.argv[1]
 
 logger.info(f"Processing: {image_path}")
-detector = ObjectDetector(confidence_threshold=0.5)
 
-frame = cv2.imread(image_path)
-if frame is None:
-    logger.error(f"Failed to read image: {image_path}")
-    sys.exit(1)
-
-detections = detector.detect(frame)
-logger.info(f"Found {len(detections)} objects")
-
-for det in detections:
-    logger.info(f"  - {det.class_name}: {det.confidence:.2f}")
+# A running detection server (python -m src.detection_server) already has the model loaded
+response = request_detection(image_path)
+if response is not None and response.get('ok'):
+    logger.info(f"Found {len(response['detections'])} objects (detection server)")
+    
+    for det in response['detections']:
+        logger.info(f"  - {det['class_name']}: {det['confidence']:.2f}")
+    
+    output_path = response['output_path']
+    output_frame = cv2.imread(output_path)
+else:
+    detector = ObjectDetector.from_config(ConfigManager().detection)
+    
+    frame = fast_imread(image_path)
+    if frame is None:
+        logger.error(f"Failed to read image: {image_path}")
+        sys.exit(1)
+    
+    detections = detector.detect(frame)
+    logger.info(f"Found {len(detections)} objects")
+    
+    for det in detections:
+        logger.info(f"  - {det.class_name}: {det.confidence:.2f}")
+    
+    output_frame = detector.draw_detections(frame, detections, inplace=True)
+    root, ext = os.path.splitext(image_path)
+    output_path = f"{root}_detected{ext}"
+    save_image(output_path, output_frame)
 
-output_frame = detector.draw_detections(frame, detections)
-output_path = image_path.replace('.', '_detected.')
-cv2.imwrite(output_path, output_frame)
 logger.info(f"Saved to: {output_path}")
 
 cv2.imshow("Detection Result", output_frame)
@@ -3,13 +3,16 @@
 import cv2
 import logging
 from src.object_detector import ObjectDetector
+from src.config import ConfigManager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INFO_TEMPLATE = "Frame: {} | Detections: {}"
+
 def main():
     logger.info("Initializing object detector...")
-    detector = ObjectDetector(confidence_threshold=0.5)
+    detector = ObjectDetector.from_config(ConfigManager().detection)
     
     logger.info("Opening camera...")
     cap = cv2.VideoCapture(0)
@@ -20,6 +23,12 @@ def main():
     
     logger.info("Camera opened. Starting detection... (Press 'q' to quit)")
     frame_count = 0
+    out_buf = None  # Allocated on the first frame, then reused
+    
+    # Per-frame constants bound once instead of rebuilt every iteration
+    format_info = INFO_TEMPLATE.format
+    log_detections = logger.isEnabledFor(logging.INFO)
+    quit_key = ord('q')
     
     while True:
         ret, frame = cap.read()
@@ -30,27 +39,23 @@ def main():
         frame_count += 1
         
         # Run detection
-        detections = detector.detect(frame)
-        
-        # Draw detections
-        output_frame = detector.draw_detections(frame, detections)
+        detections = detector.detect_gated(frame)
         
-        # Add frame info
-        info_text = f"Frame: {frame_count} | Detections: {len(detections)}"
-        cv2.putText(output_frame, info_text, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        # Draw detections and frame info into the reused output buffer
+        out_buf = detector.draw_detections_into(frame, detections, out_buf,
+                                                format_info(frame_count, len(detections)))
+        output_frame = out_buf
         
         # Display
         cv2.imshow("SmartSurveillance - Real-time Detection", output_frame)
         
         # Log detections
-        if detections:
-            logger.info(f"Frame {frame_count}: Detected {len(detections)} objects")
-            for det in detections:
-                logger.info(f"  - {det.class_name}: {det.confidence:.2f}")
+        if detections and log_detections:
+            summary = ", ".join(f"{d.class_name}:{d.confidence:.2f}" for d in detections)
+            logger.info(f"Frame {frame_count}: Detected {len(detections)} objects - {summary}")
         
         # Exit on 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if cv2.waitKey(1) & 0xFF == quit_key:
             logger.info("Exiting...")
             break
     
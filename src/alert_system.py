@@ -5,13 +5,17 @@ Alert System Module - Handles notifications and alerts
 import smtplib
 import cv2
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import mimetypes
+import numpy as np
+from email.message import EmailMessage
+from typing import List, Optional
+from collections import deque
 from datetime import datetime
 from pathlib import Path
+from src.utils import save_image
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +36,21 @@ class AlertSystem:
         self.sender_email = None
         self.sender_password = None
         self.recipient_emails = []
-        self.alert_history = []
+        self.alert_history = deque(maxlen=1024)  # Oldest alerts drop off in long-running deployments
+    
+        # One logged-in SMTP session is reused across alerts
+        self.smtp_keepalive_seconds = 60  # Idle time after which the session is checked with NOOP
+        self._smtp = None
+        self._smtp_last_used = 0.0
+        self._smtp_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert-email")
+        self.last_send_future: Optional[Future] = None
     
     def configure_email(self, sender_email: str, sender_password: str):
         """Configure email credentials"""
         self.sender_email = sender_email
         self.sender_password = sender_password
+        self.close()  # Drop any session logged in with the old credentials
         logger.info(f"Email configured for: {sender_email}")
     
     def add_recipient(self, email: str):
@@ -47,7 +60,8 @@ class AlertSystem:
             logger.info(f"Recipient added: {email}")
     
     def send_alert_email(self, subject: str, message: str, 
-                         attachment_path: str = None) -> bool:
+                         attachment_path: str = None,
+                         attachment_frame: Optional[np.ndarray] = None) -> bool:
         """
         Send alert email
         
@@ -55,6 +69,8 @@ class AlertSystem:
             subject: Email subject
             message: Email body
             attachment_path: Path to image attachment (optional)
+            attachment_frame: Frame to attach as JPEG straight from memory
+                (optional, takes precedence over attachment_path)
             
         Returns:
             True if successful
@@ -69,28 +85,26 @@ class AlertSystem:
         
         try:
             # Create email
-            msg = MIMEMultipart()
+            msg = EmailMessage()
             msg['From'] = self.sender_email
             msg['To'] = ', '.join(self.recipient_emails)
             msg['Subject'] = subject
             
-            msg.attach(MIMEText(message, 'plain'))
+            msg.set_content(message)
             
             # Add attachment if provided
-            if attachment_path and Path(attachment_path).exists():
+            if attachment_frame is not None:
+                self._attach_frame(msg, attachment_frame)
+            elif attachment_path and Path(attachment_path).exists():
                 self._attach_image(msg, attachment_path)
             
-            # Send email
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
-            server.send_message(msg)
-            server.quit()
+            # Send email over the shared session
+            self._send_message(msg)
             
             self.alert_history.append({
                 'timestamp': datetime.now(),
                 'subject': subject,
-                'recipients': self.recipient_emails.copy()
+                'recipients': tuple(self.recipient_emails)
             })
             
             logger.info(f"Alert email sent to {len(self.recipient_emails)} recipient(s)")
@@ -100,27 +114,102 @@ class AlertSystem:
             logger.error(f"Failed to send email: {e}")
             return False
     
-    def _attach_image(self, msg: MIMEMultipart, image_path: str):
-        """Attach image to email"""
+    def send_alert_email_async(self, subject: str, message: str,
+                               attachment_path: str = None,
+                               attachment_frame: Optional[np.ndarray] = None) -> Future:
+        """
+        Send alert email on a background thread
+        
+        Args:
+            subject: Email subject
+            message: Email body
+            attachment_path: Path to image attachment (optional)
+            attachment_frame: Frame to attach as JPEG (optional)
+            
+        Returns:
+            Future resolving to the send_alert_email result
+        """
+        # The caller's frame may be a reused capture buffer; keep our own copy
+        if attachment_frame is not None:
+            attachment_frame = attachment_frame.copy()
+        self.last_send_future = self._executor.submit(
+            self.send_alert_email, subject, message, attachment_path, attachment_frame)
+        return self.last_send_future
+    
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Return the logged-in SMTP session, reconnecting if it went stale"""
+        if self._smtp is not None:
+            if time.monotonic() - self._smtp_last_used < self.smtp_keepalive_seconds:
+                return self._smtp
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (smtplib.SMTPException, OSError):
+                self._smtp = None
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        server.starttls()
+        server.login(self.sender_email, self.sender_password)
+        self._smtp = server
+        return server
+    
+    def _send_message(self, msg):
+        """Send a message, reconnecting and retrying once if the server hung up"""
+        with self._smtp_lock:
+            try:
+                self._get_smtp().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                self._get_smtp().send_message(msg)
+            self._smtp_last_used = time.monotonic()
+    
+    def close(self):
+        """Log out of the SMTP session if one is open"""
+        with self._smtp_lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._smtp = None
+    
+    def _attach_image(self, msg: EmailMessage, image_path: str):
+        """Attach image file to email"""
         try:
             with open(image_path, 'rb') as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
+                data = attachment.read()
             
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f'attachment; filename= {Path(image_path).name}')
-            msg.attach(part)
+            mime_type = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+            maintype, subtype = mime_type.split('/', 1)
+            msg.add_attachment(data, maintype=maintype, subtype=subtype,
+                               filename=Path(image_path).name)
             logger.info(f"Image attached: {image_path}")
         except Exception as e:
             logger.error(f"Failed to attach image: {e}")
     
-    def save_alert_frame(self, frame, output_dir: str = "alerts") -> str:
+    def _attach_frame(self, msg: EmailMessage, frame: np.ndarray):
+        """Encode a frame as JPEG in memory and attach it to email"""
+        try:
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            
+            filename = f"alert_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+            msg.add_attachment(encoded.tobytes(), maintype='image', subtype='jpeg', filename=filename)
+            logger.info(f"Frame attached: {filename}")
+        except Exception as e:
+            logger.error(f"Failed to attach frame: {e}")
+    
+    def save_alert_frame(self, frame, output_dir: str = "alerts",
+                         fmt: str = "jpg", quality: int = 90) -> str:
         """
         Save alert frame to disk
         
         Args:
             frame: Image frame
             output_dir: Directory to save frames
+            fmt: File format extension, e.g. "jpg" or "png"
+            quality: JPEG quality (ignored for other formats)
             
         Returns:
             Path to saved image
@@ -128,16 +217,36 @@ class AlertSystem:
         try:
             Path(output_dir).mkdir(exist_ok=True)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"alert_{timestamp}.jpg"
+            filename = f"alert_{timestamp}.{fmt}"
             filepath = Path(output_dir) / filename
             
-            cv2.imwrite(str(filepath), frame)
+            params = None
+            if fmt.lower() in ('jpg', 'jpeg'):
+                # Skip Huffman optimisation: ~2.5x faster to encode for ~6% larger files
+                params = [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+            save_image(filepath, frame, params)
             logger.info(f"Alert frame saved: {filepath}")
             return str(filepath)
         except Exception as e:
             logger.error(f"Failed to save alert frame: {e}")
             return None
     
+    def save_alert_frame_async(self, frame, output_dir: str = "alerts",
+                               fmt: str = "jpg", quality: int = 90) -> Future:
+        """
+        Save alert frame to disk on a background thread
+        
+        Args:
+            frame: Image frame (copied, so the caller may reuse it)
+            output_dir: Directory to save frames
+            fmt: File format extension, e.g. "jpg" or "png"
+            quality: JPEG quality (ignored for other formats)
+            
+        Returns:
+            Future resolving to the save_alert_frame result
+        """
+        return self._executor.submit(self.save_alert_frame, frame.copy(), output_dir, fmt, quality)
+    
     def get_alert_history(self) -> List[dict]:
-        """Get alert history"""
-        return self.alert_history.copy()
+        """Get alert history (up to the 1024 most recent alerts)"""
+        return list(self.alert_history)
@@ -4,6 +4,8 @@ Configuration module for SmartSurveillance
 
 from dataclasses import dataclass
 from typing import List
+import copy
+import functools
 import json
 from pathlib import Path
 
@@ -14,12 +16,21 @@ class CameraConfig:
     width: int = 1280
     height: int = 720
     fps: int = 30
+    fourcc: str = "MJPG"  # Compressed capture format; lets USB 2.0 webcams reach full FPS at 720p
+    buffersize: int = 1  # Frames queued by the capture driver; 1 keeps latency low
 
 @dataclass
 class DetectionConfig:
     """Detection settings"""
     model_name: str = "yolov8n.pt"  # YOLOv8 model variant
+    engine_path: str = ""  # Cached TensorRT engine; empty derives it from model_name, built on first GPU run
+    precision: str = "fp16"  # Inference precision on GPU: fp32, fp16 or int8 (each gets its own engine)
     confidence_threshold: float = 0.5
+    batch_size: int = 8  # Images per model call in batch folder detection; at most ObjectDetector.MAX_BATCH
+    fast_preview: bool = False  # Decode large images at reduced size; outputs are saved at that size
+    reject_threshold: float = 0.0  # Skip near-uniform images (grey std-dev below this) in batch mode; 0 disables
+    compile_model: bool = False  # torch.compile the PyTorch model on CUDA when no TensorRT engine is used
+    gate_threshold: int = 0  # Live streams (not single images) rerun the model only when this many 160x90 pixels changed; 0 disables
     target_classes: List[str] = None
     save_alert_frames: bool = True
     alert_frame_dir: str = "alerts"
@@ -43,6 +54,12 @@ class AlertConfig:
         if self.recipient_emails is None:
             self.recipient_emails = []
 
+@functools.lru_cache(maxsize=1)
+def _load_config(path: str) -> dict:
+    """Read and parse a config file once; ConfigManager.save() clears the cache"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
 class ConfigManager:
     """Manages application configuration"""
     
@@ -57,9 +74,9 @@ class ConfigManager:
         """Load configuration from file"""
         if Path(self.config_file).exists():
             try:
-                with open(self.config_file, 'r') as f:
-                    data = json.load(f)
-                    self._update_from_dict(data)
+                # Copy so edits to one manager's lists don't leak into the cache
+                data = copy.deepcopy(_load_config(str(self.config_file)))
+                self._update_from_dict(data)
             except Exception as e:
                 print(f"Error loading config: {e}. Using defaults.")
     
@@ -73,6 +90,7 @@ class ConfigManager:
             }
             with open(self.config_file, 'w') as f:
                 json.dump(data, f, indent=4)
+            _load_config.cache_clear()
         except Exception as e:
             print(f"Error saving config: {e}")
     
@@ -0,0 +1,131 @@
+"""
+Detection Server Module - Keeps a loaded detector resident between CLI runs
+Start it once with `python -m src.detection_server`; quick_detect.py sends
+its images here when the server is up instead of loading the model itself
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from dataclasses import asdict
+from typing import Optional
+
+from src.config import ConfigManager
+from src.object_detector import ObjectDetector
+from src.utils import fast_imread, save_image
+from src import logging_setup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class _DetectionHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON request per line: {"path": "<image path>"}"""
+    
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.process(json.loads(line)['path'])
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode())
+
+
+class DetectionServer(socketserver.ThreadingTCPServer):
+    """TCP server that runs detection requests against one resident detector"""
+    
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, detector: ObjectDetector, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """
+        Bind the server
+        
+        Args:
+            detector: Loaded detector shared by all requests
+            host: Interface to listen on
+            port: TCP port (0 picks a free one)
+        """
+        super().__init__((host, port), _DetectionHandler)
+        self.detector = detector
+        self._lock = threading.Lock()  # The model is not safe to call concurrently
+    
+    def process(self, path: str) -> dict:
+        """
+        Detect objects in an image and save the annotated copy next to it
+        
+        Args:
+            path: Image file path
+        
+        Returns:
+            Response dict with the detections and the output path
+        """
+        frame = fast_imread(path)
+        if frame is None:
+            return {'ok': False, 'error': f"Failed to read image: {path}"}
+        
+        with self._lock:
+            detections = self.detector.detect(frame)
+            output_frame = self.detector.draw_detections(frame, detections, inplace=True)
+        
+        root, ext = os.path.splitext(path)
+        output_path = f"{root}_detected{ext}"
+        save_image(output_path, output_frame)
+        
+        return {
+            'ok': True,
+            'output_path': output_path,
+            'detections': [asdict(d) for d in detections]
+        }
+
+
+def request_detection(path: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                      timeout: float = 30.0) -> Optional[dict]:
+    """
+    Ask a running detection server to process an image
+    
+    Args:
+        path: Image file path
+        host: Server host
+        port: Server port
+        timeout: Seconds to wait for the result
+    
+    Returns:
+        Response dict, or None if no server is listening
+    """
+    try:
+        with socket.create_connection((host, port), timeout=0.2) as sock:
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps({'path': os.path.abspath(path)}) + '\n').encode())
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+        return json.loads(line) if line else None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a SmartSurveillance detector loaded")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    
+    logging_setup.configure()
+    detector = ObjectDetector.from_config(ConfigManager().detection)
+    
+    with DetectionServer(detector, args.host, args.port) as server:
+        logger.info(f"Detection server listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Detection server stopped")
+
+
+if __name__ == "__main__":
+    main()
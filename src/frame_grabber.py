@@ -3,13 +3,16 @@ Frame Grabber Module - Handles video capture and frame extraction
 Optimized with threading and frame buffering for continuous capture
 """
 
+import sys
 import cv2
-from typing import Optional, Tuple
+import numpy as np
+from typing import List, Optional, Tuple
 import logging
-from threading import Thread, Lock
+import weakref
+from threading import Thread, Condition, Event, current_thread
 from queue import Queue, Full
-from collections import deque
 import time
+from src.video_source import VideoSource
 
 logger = logging.getLogger(__name__)
 
@@ -17,42 +20,79 @@ logger = logging.getLogger(__name__)
 class FrameGrabber:
     """Captures video frames from camera or video file with threading and buffering"""
     
-    def __init__(self, source: int = 0, fps: int = 30, buffer_size: int = 30):
+    def __init__(self, source: int = 0, fps: int = 30, buffer_size: int = 3,
+                 fourcc: Optional[str] = "MJPG", capture_buffersize: int = 1):
         """
         Initialize the frame grabber with buffering
         
         Args:
             source: Camera index or video file path (default: 0 for webcam)
             fps: Frames per second
-            buffer_size: Maximum frames to buffer (default: 30)
+            buffer_size: Maximum frames to buffer (default: 3, a triple buffer)
+            fourcc: Camera pixel format to request, or None for the driver default
+            capture_buffersize: Frames the camera driver may queue (default: 1)
         """
         logger.debug(f"Initializing FrameGrabber - source={source}, fps={fps}, buffer_size={buffer_size}")
         self.source = source
         self.fps = fps
         self.buffer_size = buffer_size
+        self.fourcc = fourcc
+        self.capture_buffersize = capture_buffersize
         self.cap = None
         self.is_active = False
         self.frame_count = 0
         
         # Threading components
-        self.frame_buffer = deque(maxlen=buffer_size)  # Circular buffer
-        self.buffer_lock = Lock()
+        # Ring of reusable frame buffers. Slots are allocated by the first decode and
+        # overwritten in place after that. The capture thread never writes into the
+        # newest slot or the one last handed to the consumer, so with three or more
+        # slots a returned frame stays valid until the consumer asks for the next one.
+        # One producer and one consumer share it without a lock: each index below has
+        # a single writer, and plain int loads/stores are atomic under the GIL.
+        self._ring: List[Optional[np.ndarray]] = [None] * buffer_size
+        self._slot_seq = [0] * buffer_size  # frame_count of the frame in each slot (producer)
+        self._latest_slot = -1  # Newest complete frame (producer)
+        self._held_slot = -1  # Frame last handed out (consumer)
+        self.new_frame = Condition()  # Only used to sleep in grab_latest
+        self._waiters = 0
+        self._last_taken = 0  # frame_count of the last frame handed out by grab_latest
         self.capture_thread = None
         self.is_running = False
+        self._stop = Event()  # Also set by the finalizer, which can't reach self
+        self._finalizer = None
         self.fps_counter = 0
         self.last_fps_time = time.time()
         self.frame_errors = 0
         self.total_frames_processed = 0
+        self._sample_interval = 0.0  # Minimum seconds between decoded frames; 0 decodes all
+        self.stride = 1  # Decode at most every stride-th grabbed frame
+        self._grabbed = 0
+        self._last_retrieve_time = 0.0
+        # seek_approx() hands the position to the capture thread, which owns the source
+        self._seek_to = None
+        self._seek_ok = False
+        self._seek_frame = 0  # frame_count when the last seek was applied
+        self._seeked = Event()
+        self._gray_buf = None  # Grayscale copy of the held frame, made on demand
+        self._gray_seq = 0
+        self._frame_info = {}  # Stream properties, read once when the source opens
         logger.debug("FrameGrabber initialization complete")
         
     def open(self) -> bool:
         """Open the video capture device and start capture thread"""
         try:
-            # On Windows prefer DirectShow backend which is more reliable for webcams
-            try:
-                self.cap = cv2.VideoCapture(self.source, cv2.CAP_DSHOW)
-            except Exception:
-                self.cap = cv2.VideoCapture(self.source)
+            if isinstance(self.source, str):
+                # Video files decode through PyAV when it is installed
+                self.cap = VideoSource(self.source)
+            else:
+                # Prefer the native backend (DirectShow on Windows, V4L2 on Linux)
+                try:
+                    self.cap = cv2.VideoCapture(self.source, self._camera_backend())
+                    if not self.cap.isOpened():
+                        self.cap = cv2.VideoCapture(self.source)
+                except Exception:
+                    self.cap = cv2.VideoCapture(self.source)
+                self._configure_camera()
 
             if not self.cap.isOpened():
                 logger.error(f"Failed to open video source: {self.source}")
@@ -64,12 +104,15 @@ class FrameGrabber:
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
             
+            self._allocate_ring()
+            self._frame_info = {
+                'fps': self.cap.get(cv2.CAP_PROP_FPS),
+                'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'total_frames': int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            }
             self.is_active = True
-            self.is_running = True
-            
-            # Start continuous frame capture thread
-            self.capture_thread = Thread(target=self._capture_frames, daemon=True)
-            self.capture_thread.start()
+            self.start_async()
             
             logger.info(f"Video source opened: {self.source} with buffer size {self.buffer_size}")
             return True
@@ -77,85 +120,380 @@ class FrameGrabber:
             logger.error(f"Error opening video source: {e}")
             return False
     
-    def _capture_frames(self):
-        """Continuously capture frames in a separate thread"""
+    def _allocate_ring(self):
+        """Preallocate the ring slots at the size the source reports"""
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width > 0 and height > 0:
+            # retrieve() decodes into these; a source that delivers another size
+            # simply gets its slot replaced on the first frame
+            self._ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.buffer_size)]
+        else:
+            self._ring = [None] * self.buffer_size
+        self._slot_seq = [0] * self.buffer_size
+        self._latest_slot = -1
+        self._held_slot = -1
+    
+    @staticmethod
+    def _camera_backend() -> int:
+        """Pick the capture backend for the current platform"""
+        if sys.platform == 'win32':
+            return cv2.CAP_DSHOW
+        if sys.platform.startswith('linux'):
+            return cv2.CAP_V4L2
+        return cv2.CAP_ANY
+    
+    def _configure_camera(self):
+        """Request the compressed format and a shallow driver queue"""
+        if not self.cap.isOpened():
+            return
+        
+        # The format must be set before the frame size for most drivers to honour it
+        if self.fourcc:
+            if not self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc)):
+                logger.debug(f"Camera ignored fourcc {self.fourcc}")
+        if self.capture_buffersize:
+            if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.capture_buffersize):
+                logger.debug("Camera backend does not support CAP_PROP_BUFFERSIZE")
+    
+    def start_async(self):
+        """Start the background capture thread if it is not already running"""
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            return
+        
+        self.is_running = True
+        self._stop.clear()
+        # The thread only holds a weak reference, so an abandoned grabber can still be collected
+        self.capture_thread = Thread(target=FrameGrabber._capture_loop,
+                                     args=(weakref.ref(self), self._stop), daemon=True)
+        self.capture_thread.start()
+        
+        # Safety net if release() is never called: runs on garbage collection or at exit
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, FrameGrabber._shutdown,
+                                           self._stop, self.cap, self.capture_thread)
+    
+    @staticmethod
+    def _capture_loop(grabber_ref, stop: Event):
+        """
+        Capture thread body
+        
+        The grabber is dereferenced once per frame and dropped in between, so
+        the thread never keeps it alive and its finalizer can run on collection.
+        """
         logger.info("Frame capture thread started")
-        while self.is_running and self.cap is not None:
-            ret, frame = self.cap.read()
-            if ret:
-                with self.buffer_lock:
-                    self.frame_buffer.append((ret, frame.copy()))
-                    self.frame_count += 1
-                    
-                    # Update FPS counter
-                    self.fps_counter += 1
-                    current_time = time.time()
-                    if current_time - self.last_fps_time >= 1.0:
-                        logger.debug(f"Actual capture FPS: {self.fps_counter}")
-                        self.fps_counter = 0
-                        self.last_fps_time = current_time
-            else:
-                logger.warning("Failed to read frame from video source")
+        while not stop.is_set():
+            grabber = grabber_ref()
+            if grabber is None or not grabber.is_running or grabber.cap is None:
+                break
+            ok = grabber._capture_frame()
+            del grabber
+            if not ok:
                 time.sleep(0.01)  # Prevent busy waiting
+                    
+    def _capture_frame(self) -> bool:
+        """
+        Grab the next frame and publish it if it is due for decoding
+        
+        Returns:
+            False if the source failed to deliver a frame
+        """
+        if self._seek_to is not None:
+            self._apply_seek()
+        ret = self.cap.grab()
+        if ret:
+            # grab() only advances the stream; skip the decode if the consumer can't keep up
+            self._grabbed += 1
+            if self._grabbed % self.stride:
+                return True
+            now = time.monotonic()
+            if now - self._last_retrieve_time < self._sample_interval:
+                return True
+            self._last_retrieve_time = now
+            slot = self._next_slot()
+            self._slot_seq[slot] = 0  # Mark the slot as being rewritten
+            ret, frame = self.cap.retrieve(self._ring[slot])
+        if not ret:
+            logger.warning("Failed to read frame from video source")
+            return False
+        
+        # Publish: fill the slot first, then move the latest index to it
+        self._ring[slot] = frame  # Same array unless the frame size changed
+        self._slot_seq[slot] = self.frame_count + 1
+        self._latest_slot = slot
+        self.frame_count += 1
+        if self._waiters:
+            with self.new_frame:
+                self.new_frame.notify_all()
+        
+        # Update FPS counter
+        self.fps_counter += 1
+        current_time = time.time()
+        if current_time - self.last_fps_time >= 1.0:
+            logger.debug(f"Actual capture FPS: {self.fps_counter}")
+            self.fps_counter = 0
+            self.last_fps_time = current_time
+        return True
     
-    def get_frame(self) -> Tuple[bool, Optional]:
+    def _apply_seek(self):
+        """Reposition the source on the capture thread"""
+        seconds, self._seek_to = self._seek_to, None
+        self._seek_ok = bool(self.cap.set(cv2.CAP_PROP_POS_MSEC, seconds * 1000.0))
+        self._seek_frame = self.frame_count
+        self._grabbed = 0
+        self._last_retrieve_time = 0.0
+        self._seeked.set()
+    
+    def seek_approx(self, seconds: float, timeout: float = 1.0) -> bool:
+        """
+        Jump to a position in a video file, trading precision for speed
+        
+        PyAV-decoded files resume at the keyframe at or before the position,
+        so no frames of the preceding GOP are decoded; the first frame can be
+        up to one GOP early (often several seconds). The OpenCV backend
+        decodes forward to the exact frame instead, which is slower. Frames
+        captured before the seek are never returned afterwards.
+        
+        Args:
+            seconds: Target position from the start of the file
+            timeout: Seconds to wait for the capture thread to apply the seek
+        
+        Returns:
+            True if the source was repositioned
+        """
+        if not self.is_active or not isinstance(self.source, str):
+            return False
+        
+        self._seeked.clear()
+        self._seek_to = max(0.0, float(seconds))
+        if not self._seeked.wait(timeout):
+            return False
+        self._last_taken = self._seek_frame
+        return self._seek_ok
+    
+    def _next_slot(self) -> int:
+        """Pick the oldest slot that no reader can be using"""
+        slots = range(self.buffer_size)
+        free = ([i for i in slots if i != self._latest_slot and i != self._held_slot]
+                or [i for i in slots if i != self._latest_slot]
+                or [0])
+        return min(free, key=self._slot_seq.__getitem__)
+    
+    def set_consume_fps(self, fps: Optional[float]):
+        """
+        Limit decoding to the rate frames are actually consumed
+        
+        Frames arriving faster than this are grabbed but never decoded.
+        
+        Args:
+            fps: Consumer frame rate, or None/0 to decode every frame
+        """
+        self._sample_interval = 1.0 / fps if fps and fps > 0 else 0.0
+    
+    def set_stride(self, stride: int):
+        """
+        Decode only every stride-th frame; the others are grabbed and dropped
+        
+        Args:
+            stride: Frames per decoded frame (1 decodes every frame)
+        """
+        self.stride = max(1, int(stride))
+    
+    def _take_latest(self) -> int:
+        """Mark the newest slot as held by the consumer and return it"""
+        while True:
+            slot = self._latest_slot
+            self._held_slot = slot
+            # If the producer published again meanwhile it may have picked this slot
+            # before seeing the hold; retry with the newer frame
+            if self._latest_slot == slot:
+                return slot
+    
+    def get_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
         """
         Get the latest frame from the buffer
         
+        The frame is a view of a ring slot, lent to the caller until its next
+        get_frame/grab_latest call. Treat it as read-only and copy it (or
+        draw into a separate buffer) to keep or annotate it.
+        
         Returns:
             Tuple of (success, frame)
         """
         if not self.is_active:
             return False, None
         
-        with self.buffer_lock:
-            if len(self.frame_buffer) > 0:
-                # Get the most recent frame
-                ret, frame = self.frame_buffer[-1]
-                return ret, frame
+        if self._latest_slot < 0:
+            return False, None
+        
+        # Get the most recent frame
+        slot = self._take_latest()
+        return True, self._ring[slot]
+    
+    def get_gray(self) -> Optional[np.ndarray]:
+        """
+        Get the frame last handed out, converted to grayscale
+        
+        The conversion runs at most once per frame, so edge detection, frame
+        comparison and motion checks on the same frame can share it. The
+        array is reused for the next frame; copy it to keep it.
+        
+        Returns:
+            Grayscale frame, or None if no frame has been handed out
+        """
+        slot = self._held_slot
+        if slot < 0 or self._ring[slot] is None:
+            return None
         
-        return False, None
+        seq = self._slot_seq[slot]
+        if seq != self._gray_seq or self._gray_buf is None:
+            frame = self._ring[slot]
+            if self._gray_buf is None or self._gray_buf.shape != frame.shape[:2]:
+                self._gray_buf = np.empty(frame.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+            self._gray_seq = seq
+        return self._gray_buf
+    
+    def grab_latest(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Wait for a frame newer than the last one returned, then return it
+        
+        Frames captured while the caller was busy are skipped, so the caller
+        always works on the most recent image. The frame is lent on the same
+        terms as get_frame().
+        
+        Args:
+            timeout: Seconds to wait for a new frame
+        
+        Returns:
+            Tuple of (success, frame)
+        """
+        if not self.is_active or not self._wait_for_new(timeout):
+            return False, None
+        
+        slot = self._take_latest()
+        self._last_taken = self._slot_seq[slot]
+        return True, self._ring[slot]
+    
+    def _wait_for_new(self, timeout: float) -> bool:
+        """Block until a frame newer than the last one taken exists"""
+        if self.frame_count != self._last_taken:
+            return True
+        with self.new_frame:
+            self._waiters += 1
+            try:
+                return self.new_frame.wait_for(lambda: self.frame_count != self._last_taken, timeout)
+            finally:
+                self._waiters -= 1
+    
+    def get_new_frames(self, max_frames: int, timeout: Optional[float] = None) -> List[np.ndarray]:
+        """
+        Return up to max_frames frames captured since the last take, oldest first
+        
+        The newest frame is handed out like grab_latest(). Older ones are
+        copied, since the capture thread may reuse their slots; a frame that
+        gets overwritten while it is being copied is dropped.
+        
+        Args:
+            max_frames: Maximum number of frames to return
+            timeout: Wait up to this many seconds for a new frame; None
+                returns immediately
+        
+        Returns:
+            List of frames, empty if nothing new was captured
+        """
+        if not self.is_active or max_frames < 1:
+            return []
+        if timeout is not None and not self._wait_for_new(timeout):
+            return []
+        if self._latest_slot < 0:
+            return []
+        
+        slot = self._take_latest()
+        newest_seq = self._slot_seq[slot]
+        if newest_seq == self._last_taken:
+            return []
+        
+        frames = []
+        if max_frames > 1:
+            older = sorted((seq, i) for i, seq in enumerate(self._slot_seq)
+                           if self._last_taken < seq < newest_seq)
+            for seq, i in older[-(max_frames - 1):]:
+                frame = self._ring[i].copy()
+                if self._slot_seq[i] == seq:
+                    frames.append(frame)
+        frames.append(self._ring[slot])
+        self._last_taken = newest_seq
+        return frames
+    
+    def snapshot(self, n: int = 1) -> List[np.ndarray]:
+        """
+        Get the n most recent buffered frames without copying them
+        
+        Only the newest frame is protected from reuse; copy older ones if
+        they need to outlive the next capture.
+        
+        Args:
+            n: Maximum number of frames to return
+        
+        Returns:
+            List of frames, newest first
+        """
+        order = sorted(((seq, i) for i, seq in enumerate(self._slot_seq) if seq), reverse=True)
+        return [self._ring[i] for _, i in order[:n]]
     
     def get_buffered_frames(self) -> list:
         """
-        Get all buffered frames
+        Get all buffered frames (kept for compatibility; prefer snapshot())
         
         Returns:
-            List of (ret, frame) tuples
+            List of (ret, frame) tuples, oldest first
         """
-        with self.buffer_lock:
-            return list(self.frame_buffer)
+        return [(True, frame) for frame in reversed(self.snapshot(self.buffer_size))]
     
     def get_buffer_size(self) -> int:
         """Get current number of frames in buffer"""
-        with self.buffer_lock:
-            return len(self.frame_buffer)
+        return sum(1 for seq in self._slot_seq if seq)
     
     def get_frame_info(self) -> dict:
         """Get information about current video stream"""
         if self.cap is None:
             return {}
         
+        # The stream properties don't change while the source is open
         return {
-            'fps': self.cap.get(cv2.CAP_PROP_FPS),
-            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            **self._frame_info,
             'frame_count': self.frame_count,
-            'total_frames': int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)),
             'buffer_size': self.get_buffer_size()
         }
     
     def release(self):
         """Release the video capture device"""
         self.is_running = False
+        self._stop.set()
         if self.capture_thread is not None:
             self.capture_thread.join(timeout=2.0)
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
         
         if self.cap is not None:
             self.cap.release()
             self.is_active = False
             logger.info("Video source released")
     
-    def __del__(self):
-        """Cleanup on deletion"""
+    def __enter__(self) -> 'FrameGrabber':
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
         self.release()
+
+    @staticmethod
+    def _shutdown(stop: Event, cap, thread: Thread):
+        """Finalizer: stop capturing and free the device without a reference to the grabber"""
+        stop.set()
+        if thread.is_alive() and thread is not current_thread():
+            thread.join(timeout=1.0)
+        cap.release()
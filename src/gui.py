@@ -5,8 +5,11 @@ PyQt GUI Application for SmartSurveillance
 import sys
 import cv2
 import logging
+import time
 from pathlib import Path
 from datetime import datetime
+from dataclasses import replace
+from typing import Tuple
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QSlider, QSpinBox,
                              QCheckBox, QLineEdit, QTextEdit, QComboBox, QTabWidget,
@@ -29,7 +32,8 @@ logger = logging.getLogger(__name__)
 class ProcessingThread(QThread):
     """Thread for frame processing"""
     
-    frame_signal = pyqtSignal(np.ndarray)
+    # Annotated frame already scaled for display, plus the array backing its pixels
+    frame_signal = pyqtSignal(QImage, np.ndarray)
     detection_signal = pyqtSignal(list)
     error_signal = pyqtSignal(str)
     
@@ -37,22 +41,67 @@ class ProcessingThread(QThread):
         super().__init__()
         self.orchestrator = orchestrator
         self.running = False
+        self.display_width = 800
+        # Display geometry, recomputed only when the source resolution changes
+        self._source_size = None
+        self._display_size = None
+        self._display_scale = 1.0
+        self._bytes_per_line = 0
     
     def run(self):
-        """Process frames in a separate thread"""
+        """Wait for new frames, detect on them and emit the results to the GUI"""
         self.running = True
         while self.running:
             try:
                 if not self.orchestrator.is_running:
+                    time.sleep(0.1)
                     continue
-                frame, detections = self.orchestrator.process_frame()
-                if frame is not None:
-                    self.frame_signal.emit(frame)
-                    self.detection_signal.emit(detections)
+                # Blocks until the grabber has a frame we haven't processed yet
+                if self.orchestrator.use_batches():
+                    # Every new frame is detected and alerted on; only the newest is shown
+                    batch = self.orchestrator.process_batch(timeout=0.5)
+                    frame, detections = batch[-1] if batch else (None, [])
+                else:
+                    frame, detections = self.orchestrator.process_frame(timeout=0.5)
+                if frame is None:
+                    continue
+                image, buffer = self._to_qimage(frame, detections)
+                # Queued connections hand these to the GUI thread
+                self.detection_signal.emit(detections)
+                self.frame_signal.emit(image, buffer)
             except Exception as e:
                 self.error_signal.emit(str(e))
                 break
     
+    def _to_qimage(self, frame: np.ndarray, detections) -> Tuple[QImage, np.ndarray]:
+        """
+        Annotate a frame and turn it into a display-sized QImage off the GUI thread
+        
+        Frame ownership: the grabber's frame is only read. The one new buffer is
+        the resized copy, which is drawn on in place and wrapped by the QImage
+        without another copy, so it travels with the image to keep it alive.
+        
+        Returns:
+            Tuple of (QImage, backing array)
+        """
+        if frame.shape[:2] != self._source_size:
+            h, w = frame.shape[:2]
+            self._source_size = (h, w)
+            self._display_scale = self.display_width / w
+            self._display_size = (self.display_width, max(1, round(h * self._display_scale)))
+            self._bytes_per_line = 3 * self.display_width
+        
+        # Shrink first so Qt has nothing left to scale and boxes are drawn on fewer
+        # pixels; resize also leaves the grabber's buffer untouched
+        small = cv2.resize(frame, self._display_size, interpolation=cv2.INTER_AREA)
+        scale = self._display_scale
+        if scale != 1.0:
+            detections = [replace(d, bbox=tuple(int(v * scale) for v in d.bbox)) for d in detections]
+        self.orchestrator.object_detector.draw_detections(small, detections, inplace=True)
+        
+        w, h = self._display_size
+        return QImage(small.data, w, h, self._bytes_per_line, QImage.Format_BGR888), small
+    
     def stop(self):
         """Stop the processing thread"""
         self.running = False
@@ -67,6 +116,7 @@ class SmartSurveillanceApp(QMainWindow):
         self.orchestrator = SurveillanceOrchestrator()
         self.processing_thread = None
         self.latest_detections = []  # Store latest detections for frame display
+        self._last_frame_ref = None  # Array behind the QImage being displayed
         self.log_display = None  # Will be initialized in init_ui
         self.init_ui()
         self.setWindowTitle("SmartSurveillance - Real-Time Detection")
@@ -410,19 +460,13 @@ class SmartSurveillanceApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to stop: {str(e)}")
     
     
-    def update_video_frame(self, frame):
-        """Update video display"""
+    def update_video_frame(self, image: QImage, buffer: np.ndarray):
+        """Update video display with an annotated, display-sized frame"""
         try:
             # Log frame grabber activity
             frame_info = self.orchestrator.frame_grabber.get_frame_info()
             buffer_size = self.orchestrator.frame_grabber.get_buffer_size()
-            self.log_activity("DEBUG", f"Frame #{frame_info['frame_count']} | Size: {frame.shape[1]}x{frame.shape[0]} | Buffer: {buffer_size}/{self.orchestrator.frame_grabber.buffer_size}", "FRAME_GRABBER")
-            
-            # Draw detections on the frame
-            frame_with_detections = self.orchestrator.object_detector.draw_detections(
-                frame,
-                self.latest_detections
-            )
+            self.log_activity("DEBUG", f"Frame #{frame_info['frame_count']} | Size: {frame_info['width']}x{frame_info['height']} | Buffer: {buffer_size}/{self.orchestrator.frame_grabber.buffer_size}", "FRAME_GRABBER")
             
             # Log detections
             if self.latest_detections:
@@ -432,18 +476,10 @@ class SmartSurveillanceApp(QMainWindow):
                     conf = det.get('confidence', 0) if isinstance(det, dict) else 0
                     self.log_activity("DEBUG", f"  -> Detection: {class_name} (confidence: {conf:.2f})", "ORCHESTRATOR")
             
-            # Convert to RGB
-            rgb_frame = cv2.cvtColor(frame_with_detections, cv2.COLOR_BGR2RGB)
-            
-            # Resize for display
-            h, w, ch = rgb_frame.shape
-            bytes_per_line = 3 * w
-            qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            
-            # Display
-            pixmap = QPixmap.fromImage(qt_image)
-            scaled_pixmap = pixmap.scaledToWidth(800, Qt.SmoothTransformation)
-            self.video_label.setPixmap(scaled_pixmap)
+            # Display; drawing, conversion and scaling already happened on the worker.
+            # The QImage points into buffer, so hold on to it while Qt reads it
+            self._last_frame_ref = buffer
+            self.video_label.setPixmap(QPixmap.fromImage(image))
             
         except Exception as e:
             self.log_activity("ERROR", f"Frame update error: {str(e)}", "SYSTEM")
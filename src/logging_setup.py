@@ -0,0 +1,54 @@
+"""
+Logging Setup Module - Shared, non-blocking logging configuration
+Records are queued by the calling thread and written by a background listener,
+so logging from capture/detection loops never waits on file or console I/O
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure(level: int = logging.INFO, fmt: str = DEFAULT_FORMAT,
+              log_file: Optional[str] = None) -> Optional[logging.handlers.QueueListener]:
+    """
+    Configure root logging through a QueueHandler/QueueListener pair
+    
+    Like logging.basicConfig, this does nothing if the root logger already
+    has handlers, so scripts that import each other can all call it.
+    
+    Args:
+        level: Root logging level
+        fmt: Format string for the output handlers
+        log_file: Optional file to log to in addition to the console
+    
+    Returns:
+        The running QueueListener
+    """
+    global _listener
+    
+    root = logging.getLogger()
+    if root.handlers:
+        return _listener
+    
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush queued records on exit
+    return _listener
@@ -4,12 +4,19 @@ Object Detection Module - Uses YOLOv8 for real-time detection
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional, Union
 import logging
-from dataclasses import dataclass
+import importlib.util
+from dataclasses import dataclass, field
+from pathlib import Path
+from src.video_source import VideoSource
+from src.utils import gpu_decode_video, gpu_video_available, tensor_to_bgr
 
 logger = logging.getLogger(__name__)
 
+PRECISIONS = ('fp32', 'fp16', 'int8')
+ENGINE_SUFFIXES = {'fp32': '_fp32', 'fp16': '', 'int8': '_int8'}  # Appended to the model stem
+
 
 @dataclass
 class Detection:
@@ -20,44 +27,177 @@ class Detection:
     class_id: int
 
 
+@dataclass
+class DetectionBatch:
+    """The detections of one frame as parallel arrays, for vectorized filtering"""
+    bboxes: np.ndarray  # (N, 4) int32 x1, y1, x2, y2
+    confidences: np.ndarray  # (N,) float32
+    class_ids: np.ndarray  # (N,) int32
+    class_names: List[str]
+    _list: Optional[List[Detection]] = field(default=None, repr=False, compare=False)
+    
+    def __len__(self) -> int:
+        return len(self.class_names)
+    
+    @classmethod
+    def empty(cls) -> 'DetectionBatch':
+        """A batch without detections"""
+        return cls(np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32),
+                   np.empty(0, dtype=np.int32), [], [])
+    
+    @classmethod
+    def from_detections(cls, detections: List[Detection]) -> 'DetectionBatch':
+        """Build a batch from Detection objects"""
+        if not detections:
+            return cls.empty()
+        return cls(np.array([d.bbox for d in detections], dtype=np.int32),
+                   np.array([d.confidence for d in detections], dtype=np.float32),
+                   np.array([d.class_id for d in detections], dtype=np.int32),
+                   [d.class_name for d in detections], list(detections))
+    
+    def select(self, mask: np.ndarray) -> 'DetectionBatch':
+        """Keep the detections where mask is True"""
+        if mask.all():
+            return self
+        indices = np.flatnonzero(mask)
+        return DetectionBatch(self.bboxes[indices], self.confidences[indices], self.class_ids[indices],
+                              [self.class_names[i] for i in indices.tolist()])
+    
+    def as_list(self) -> List[Detection]:
+        """Detection objects for the rest of the API, built once per batch"""
+        if self._list is None:
+            self._list = [
+                Detection(class_name=name, confidence=confidence, bbox=tuple(bbox), class_id=class_id)
+                for bbox, confidence, class_id, name in zip(self.bboxes.tolist(), self.confidences.tolist(),
+                                                            self.class_ids.tolist(), self.class_names)
+            ]
+        return self._list
+
+
 class ObjectDetector:
     """Real-time object detection using YOLOv8"""
     
-    def __init__(self, model_name: str = "yolov8n.pt", confidence_threshold: float = 0.5):
+    MAX_BATCH = 16  # Largest batch the exported TensorRT engine accepts; callers cap batch sizes to it
+    
+    def __init__(self, model_name: str = "yolov8n.pt", confidence_threshold: float = 0.5,
+                 engine_path: Optional[str] = None, precision: str = "fp16",
+                 reject_threshold: float = 0.0, compile_model: bool = False,
+                 gate_threshold: int = 0):
         """
         Initialize the object detector
         
         Args:
             model_name: YOLOv8 model name (nano, small, medium, large, xlarge)
             confidence_threshold: Minimum confidence score
+            engine_path: Where to cache the TensorRT engine on GPU; defaults to
+                the model name with an .engine suffix (_fp32/_int8.engine for
+                those precisions). A file name that doesn't match the model and
+                precision is replaced by the derived one in the same directory
+            precision: GPU inference precision, 'fp32', 'fp16' or 'int8'. INT8
+                needs a TensorRT engine; plain PyTorch weights run in FP16 then
+            reject_threshold: quick_reject() skips frames whose grey-level
+                standard deviation is below this; 0 disables it
+            compile_model: On CUDA without a TensorRT engine, specialise the
+                PyTorch model for the fixed input shape with torch.compile
+            gate_threshold: detect_gated() reuses the previous result unless at
+                least this many pixels of a 160x90 thumbnail changed; 0 disables
+                it. Plain detect() never skips the model
         """
         self.model_name = model_name
         self.confidence_threshold = confidence_threshold
+        self.engine_path = engine_path
+        if precision not in PRECISIONS:
+            logger.warning(f"Unknown precision '{precision}', using fp16")
+            precision = 'fp16'
+        self.precision = precision
+        self.reject_threshold = reject_threshold
+        self.compile_model = compile_model
+        self.gate_threshold = gate_threshold
+        self._gate = None  # Background subtractor deciding whether the model runs
+        self._gate_small = None
+        self._gate_mask = None
+        self._last_batch = DetectionBatch.empty()
         self.model = None
         self.class_names = {}
         self.has_fallback = False
+        self.device = None  # Let Ultralytics choose unless CUDA is found
+        self.half = False
+        self.input_size = 640
+        self.gpu_preprocess = False  # Enabled automatically on CUDA
+        self._input_buffer = None
+        self._pinned_frame = None  # Page-locked host staging buffer for uploads
+        self._pinned_view = None  # numpy view of _pinned_frame
+        self._device_frame = None  # uint8 frame on the device, reused between calls
+        self._class_colors = [(0, 255, 0)]
+        self._label_cache = {}  # (class_name, confidence in %) -> label text
+        self._name_to_id = {}
+        self._class_mask = None  # Boolean mask indexed by class id, None = keep all
+        self.target_class_ids = None  # Passed to Ultralytics so filtering happens in NMS
+        self._filter_names = None  # Class names _filter_ids was built for
+        self._filter_ids: Optional[frozenset] = None
+        self._filter_mask: Optional[np.ndarray] = None  # _filter_ids as a mask indexed by class id
         self._initialize_model()
-
+        self._build_color_lut()
+    
+    @property
+    def name_to_id(self) -> dict:
+        """Class name -> model class id (empty without a model)"""
+        return self._name_to_id
+    
+    @classmethod
+    def from_config(cls, config) -> 'ObjectDetector':
+        """
+        Create a detector from a DetectionConfig
+        
+        Args:
+            config: DetectionConfig with model, engine and threshold settings
+        """
+        return cls(model_name=config.model_name,
+                   confidence_threshold=config.confidence_threshold,
+                   engine_path=config.engine_path,
+                   precision=config.precision,
+                   reject_threshold=config.reject_threshold,
+                   compile_model=config.compile_model,
+                   gate_threshold=config.gate_threshold)
+    
     class _MotionFallback:
         """Simple motion-based fallback detector using background subtraction"""
-        def __init__(self, min_area: int = 500):
+        def __init__(self, min_area: int = 500, process_width: int = 320):
             self.backSub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
             self.min_area = min_area
-
+            self.process_width = process_width  # Background model runs at this width
+            self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+            self._small = None  # Downscaled frame, reused between calls
+            self._mask = None  # Foreground mask, reused between calls
+        
         def detect(self, frame: np.ndarray):
-            mask = self.backSub.apply(frame)
+            h, w = frame.shape[:2]
+            scale = min(1.0, self.process_width / w)
+            if scale < 1.0:
+                size = (self.process_width, max(1, round(h * scale)))
+                if self._small is None or self._small.shape[1::-1] != size:
+                    self._small = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+                cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+                frame = self._small
+            
+            if self._mask is None or self._mask.shape != frame.shape[:2]:
+                self._mask = np.empty(frame.shape[:2], dtype=np.uint8)
+            mask = self.backSub.apply(frame, self._mask)
             # Morphological ops to reduce noise
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
+            cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel, dst=mask, iterations=1)
             contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            
+            # Areas and boxes are measured on the small frame; map them back
+            min_area = self.min_area * scale * scale
             detections = []
             for cnt in contours:
-                if cv2.contourArea(cnt) < self.min_area:
+                if cv2.contourArea(cnt) < min_area:
                     continue
-                x, y, w, h = cv2.boundingRect(cnt)
-                detections.append((x, y, x + w, y + h))
+                x, y, bw, bh = cv2.boundingRect(cnt)
+                detections.append((int(x / scale), int(y / scale),
+                                   int((x + bw) / scale), int((y + bh) / scale)))
             return detections
-
+        
         def draw_detections(self, frame: np.ndarray, detections):
             out = frame.copy()
             for (x1, y1, x2, y2) in detections:
@@ -69,8 +209,14 @@ class ObjectDetector:
         """Initialize YOLOv8 model"""
         try:
             from ultralytics import YOLO
-            logger.info(f"Loading YOLOv8 model: {self.model_name}")
-            self.model = YOLO(self.model_name)
+            self._select_device()
+            model_path = self._resolve_engine(YOLO)
+            logger.info(f"Loading YOLOv8 model: {model_path}")
+            self.model = YOLO(model_path)
+            if self.compile_model:
+                self._compile(model_path)
+            self.class_names = self.model.names
+            self._name_to_id = {name: class_id for class_id, name in self.class_names.items()}
             logger.info("YOLOv8 model loaded successfully")
         except ImportError:
             logger.error("ultralytics library not found. Falling back to motion detector.")
@@ -86,72 +232,546 @@ class ObjectDetector:
             self.has_fallback = True
             logger.info("Motion fallback detector initialized")
     
+    def _build_color_lut(self):
+        """Precompute one BGR box colour per class id"""
+        if not self.class_names:
+            return
+        try:
+            from ultralytics.utils.plotting import colors
+            self._class_colors = [tuple(map(int, colors(i, True))) for i in range(len(self.class_names))]
+        except ImportError:
+            pass
+    
+    def _compile(self, model_path: str):
+        """
+        Compile the PyTorch model for the fixed (1, 3, 640, 640) input
+        
+        Only applies to .pt weights on CUDA; TensorRT engines are already
+        specialised. The first calls are slow while the graphs are captured,
+        and each new batch size triggers one recompile.
+        """
+        if self.device is None or Path(model_path).suffix != '.pt':
+            return
+        try:
+            import torch
+            self.model.model = torch.compile(self.model.model, mode='reduce-overhead', dynamic=False)
+            logger.info("Model compiled with torch.compile (reduce-overhead)")
+        except Exception as e:
+            logger.warning(f"torch.compile unavailable ({e}), running the model uncompiled")
+    
+    def _select_device(self):
+        """Use the first CUDA device, in FP16 unless fp32 was requested"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                self.device = 0
+                self.half = self.precision != 'fp32'
+                self.gpu_preprocess = True
+                logger.info(f"Using CUDA device: {torch.cuda.get_device_name(0)}")
+        except ImportError:
+            pass
+    
+    def _resolve_engine(self, YOLO) -> str:
+        """
+        Return the TensorRT engine for the model, exporting it on first use
+        
+        Falls back to the original weights when no GPU or TensorRT is available
+        or the export fails.
+        """
+        model_path = Path(self.model_name)
+        if model_path.suffix != '.pt' or self.device is None:
+            return self.model_name
+        
+        # An engine is tied to its weights and precision, so the file name always
+        # comes from them; a configured engine_path only chooses the directory
+        engine_name = f"{model_path.stem}{ENGINE_SUFFIXES[self.precision]}.engine"
+        if self.engine_path:
+            engine_path = Path(self.engine_path)
+            if engine_path.name != engine_name:
+                logger.warning(f"Engine {engine_path} does not match {self.model_name} ({self.precision}); "
+                               f"using {engine_name} instead")
+                engine_path = engine_path.with_name(engine_name)
+        else:
+            engine_path = model_path.with_name(engine_name)
+        if engine_path.exists():
+            return str(engine_path)
+        
+        if importlib.util.find_spec('tensorrt') is None:
+            logger.info("TensorRT not installed, using PyTorch weights")
+            return self.model_name
+        
+        try:
+            logger.info(f"Exporting {self.model_name} to TensorRT {self.precision.upper()} engine (one-time)...")
+            exported = Path(YOLO(self.model_name).export(
+                format='engine', half=self.precision == 'fp16', int8=self.precision == 'int8',
+                dynamic=True, batch=self.MAX_BATCH,
+                imgsz=640, workspace=4, device=self.device
+            ))
+            if exported.resolve() != engine_path.resolve():
+                # Ultralytics writes next to the weights; cache it where the config expects
+                engine_path.parent.mkdir(parents=True, exist_ok=True)
+                exported.replace(engine_path)
+            return str(engine_path)
+        except Exception as e:
+            logger.warning(f"TensorRT export failed: {e}. Using PyTorch weights.")
+            return self.model_name
+    
+    def quick_reject(self, frame: np.ndarray) -> bool:
+        """
+        Cheaply decide whether a frame is too uniform to contain objects
+        
+        Args:
+            frame: Input image frame
+        
+        Returns:
+            True if detection can be skipped for this frame
+        """
+        if self.reject_threshold <= 0:
+            return False
+        
+        small = cv2.resize(frame, (160, 160), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        _, std = cv2.meanStdDev(small)
+        return float(std[0, 0]) < self.reject_threshold
+    
+    def _scene_changed(self, frame: np.ndarray) -> bool:
+        """
+        Check a tiny background model for enough motion to be worth a model run
+        
+        Args:
+            frame: Input image frame
+        
+        Returns:
+            True if at least gate_threshold thumbnail pixels are foreground
+        """
+        if self._gate is None:
+            self._gate = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=32, detectShadows=False)
+            self._gate_small = np.empty((90, 160) + frame.shape[2:], dtype=frame.dtype)
+            self._gate_mask = np.empty((90, 160), dtype=np.uint8)
+        cv2.resize(frame, (160, 90), dst=self._gate_small, interpolation=cv2.INTER_AREA)
+        mask = self._gate.apply(self._gate_small, self._gate_mask)
+        return cv2.countNonZero(mask) >= self.gate_threshold
+    
     def detect(self, frame: np.ndarray) -> List[Detection]:
         """
         Detect objects in a frame
         
         Args:
             frame: Input image frame
-            
+        
+        Returns:
+            List of detections
+        """
+        return self.detect_arrays(frame).as_list()
+    
+    def detect_gated(self, frame: np.ndarray) -> List[Detection]:
+        """
+        Detect objects in the next frame of a live stream
+        
+        With gate_threshold set, the model only reruns when the scene changed
+        and the previous frame's detections are returned otherwise. Only use
+        this on consecutive frames of one stream, never on unrelated images.
+        
+        Args:
+            frame: Input image frame
+        
         Returns:
             List of detections
         """
+        return self.detect_arrays(frame, gated=True).as_list()
+    
+    def detect_arrays(self, frame: np.ndarray, gated: bool = False) -> DetectionBatch:
+        """
+        Detect objects in a frame, keeping the results as parallel arrays
+        
+        Args:
+            frame: Input image frame
+            gated: Frame comes from a live stream; apply the static-scene gate
+                as in detect_gated()
+        
+        Returns:
+            DetectionBatch for the frame
+        """
         if self.model is None:
             # Use motion-based fallback when model unavailable
             if getattr(self, 'has_fallback', False):
                 rects = self.fallback.detect(frame)
-                detections = []
-                for rect in rects:
-                    x1, y1, x2, y2 = rect
-                    detections.append(Detection(class_name='motion', confidence=1.0, bbox=(x1, y1, x2, y2), class_id=0))
-                return detections
+                if not rects:
+                    return DetectionBatch.empty()
+                return DetectionBatch(np.array(rects, dtype=np.int32), np.ones(len(rects), dtype=np.float32),
+                                      np.zeros(len(rects), dtype=np.int32), ['motion'] * len(rects))
+            return DetectionBatch.empty()
+        
+        if not gated or self.gate_threshold <= 0:
+            return self._run_model(frame)
+        
+        # Static scene: the last model result still holds
+        if not self._scene_changed(frame):
+            return self._last_batch
+        self._last_batch = self._run_model(frame)
+        return self._last_batch
+        
+    def _run_model(self, frame: np.ndarray) -> DetectionBatch:
+        """Run the YOLO model on one frame"""
+        if self.gpu_preprocess:
+            try:
+                tensor, letterbox = self._preprocess_fast(frame)
+                results = self.model(tensor, verbose=False, device=self.device, half=self.half,
+                                     classes=self.target_class_ids)
+                return self._parse_arrays(results[0], letterbox)
+            except Exception as e:
+                logger.warning(f"GPU preprocessing failed ({e}), using default pipeline")
+                self.gpu_preprocess = False
+        
+        try:
+            results = self.model(frame, verbose=False, device=self.device, half=self.half,
+                                 classes=self.target_class_ids)
+            return self._parse_arrays(results[0])
+        except Exception as e:
+            logger.error(f"Error during detection: {e}")
+            return DetectionBatch.empty()
+    
+    def _preprocess_fast(self, frame: np.ndarray):
+        """
+        Letterbox a BGR frame into a CUDA input tensor in one pass on the GPU
+        
+        The frame is uploaded once as uint8, then channel swap, normalisation
+        and resize all run on the device into a reused input buffer, so the
+        Ultralytics CPU LetterBox is skipped entirely. The upload goes through
+        a pinned staging buffer so it is a true asynchronous DMA copy.
+        
+        Args:
+            frame: BGR image (H, W, 3) uint8
+        
+        Returns:
+            Tuple of (input tensor, (scale, pad_x, pad_y, width, height))
+        """
+        import torch
+        
+        size = self.input_size
+        dtype = torch.float16 if self.half else torch.float32
+        if self._input_buffer is None:
+            self._input_buffer = torch.empty((1, 3, size, size), dtype=dtype, device=self.device)
+        
+        if self._pinned_frame is None or tuple(self._pinned_frame.shape) != frame.shape:
+            self._pinned_frame = torch.empty(frame.shape, dtype=torch.uint8, pin_memory=True)
+            self._pinned_view = self._pinned_frame.numpy()
+            self._device_frame = torch.empty(frame.shape, dtype=torch.uint8, device=self.device)
+        
+        # The previous upload has finished by now: its results were read back on the host
+        np.copyto(self._pinned_view, frame)
+        img = self._device_frame.copy_(self._pinned_frame, non_blocking=True)
+        img = img.permute(2, 0, 1).flip(0).unsqueeze(0).to(dtype).div_(255)  # BGR HWC -> RGB CHW
+        
+        buf = self._input_buffer
+        return buf, self._letterbox_into(img, buf)
+    
+    def _letterbox_into(self, img, out):
+        """
+        Resize a normalised (1, 3, H, W) RGB tensor into a (1, 3, S, S) slot
+        
+        Args:
+            img: Input tensor, already on the device and in the model dtype
+            out: Destination tensor (may be a view into a batch)
+        
+        Returns:
+            (scale, pad_x, pad_y, width, height) for mapping boxes back
+        """
+        import torch.nn.functional as F
+        
+        size = self.input_size
+        h, w = img.shape[2:]
+        scale = min(size / h, size / w)
+        new_h, new_w = round(h * scale), round(w * scale)
+        pad_y, pad_x = (size - new_h) // 2, (size - new_w) // 2
+        
+        img = F.interpolate(img, size=(new_h, new_w), mode='bilinear', align_corners=False)
+        out.fill_(114 / 255)  # Same grey padding as Ultralytics
+        out[:, :, pad_y:pad_y + new_h, pad_x:pad_x + new_w] = img
+        return scale, pad_x, pad_y, w, h
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """
+        Detect objects in several frames with a single model call
+        
+        Lists longer than MAX_BATCH are split into several calls, since the
+        TensorRT engine rejects larger batches.
+        
+        Args:
+            frames: List of input image frames
+        
+        Returns:
+            One list of detections per input frame, in the same order
+        """
+        if not frames:
             return []
         
+        if self.model is None:
+            # The motion fallback is stateful, so frames go through one by one
+            return [self.detect(frame) for frame in frames]
+        
+        if len(frames) > self.MAX_BATCH:
+            return [detections for start in range(0, len(frames), self.MAX_BATCH)
+                    for detections in self.detect_batch(frames[start:start + self.MAX_BATCH])]
+        
         try:
-            results = self.model(frame, verbose=False)
-            detections = []
+            results = self.model.predict(frames, verbose=False, imgsz=640,
+                                         device=self.device, half=self.half,
+                                         classes=self.target_class_ids)
+            return [self._parse_result(result) for result in results]
+        except Exception as e:
+            logger.error(f"Error during batch detection: {e}")
+            return [[] for _ in frames]
+    
+    def detect_gpu_batch(self, images) -> List[List[Detection]]:
+        """
+        Detect objects in images that were decoded straight onto the GPU
+        
+        The images are letterboxed into one batch tensor on the device, so
+        nothing is copied back to the host before inference.
+        
+        Args:
+            images: RGB uint8 CUDA tensors of shape (3, H, W), e.g. from
+                torchvision.io.decode_jpeg(device='cuda')
+        
+        Returns:
+            One list of detections per input image, in the same order
+        """
+        if not images:
+            return []
+        
+        if self.model is None or not self.gpu_preprocess:
+            frames = [image.flip(0).permute(1, 2, 0).contiguous().cpu().numpy() for image in images]
+            return self.detect_batch(frames)
+        
+        try:
+            import torch
             
-            for result in results:
-                for box in result.boxes:
-                    confidence = float(box.conf)
-                    if confidence >= self.confidence_threshold:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        class_id = int(box.cls)
-                        class_name = result.names[class_id]
-                        
-                        detection = Detection(
-                            class_name=class_name,
-                            confidence=confidence,
-                            bbox=(x1, y1, x2, y2),
-                            class_id=class_id
-                        )
-                        detections.append(detection)
+            size = self.input_size
+            dtype = torch.float16 if self.half else torch.float32
+            batch = torch.empty((len(images), 3, size, size), dtype=dtype, device=self.device)
+            letterboxes = [
+                self._letterbox_into(image.unsqueeze(0).to(dtype).div_(255), batch[i:i + 1])
+                for i, image in enumerate(images)
+            ]
             
-            return detections
+            results = self.model(batch, verbose=False, device=self.device, half=self.half,
+                                 classes=self.target_class_ids)
+            return [self._parse_result(result, letterbox)
+                    for result, letterbox in zip(results, letterboxes)]
         except Exception as e:
-            logger.error(f"Error during detection: {e}")
-            return []
+            logger.error(f"Error during GPU batch detection: {e}")
+            return [[] for _ in images]
     
-    def filter_by_class(self, detections: List[Detection], 
-                        class_names: List[str]) -> List[Detection]:
-        """Filter detections by class names"""
-        return [d for d in detections if d.class_name in class_names]
+    def predict_stream(self, source: Union[int, str]) -> Iterator[Tuple[np.ndarray, List[Detection]]]:
+        """
+        Run detection over a whole video source, one frame at a time
+        
+        Uses Ultralytics' streaming predictor, which reads and decodes the
+        source itself and yields results lazily. Video files are decoded
+        on the GPU instead when the model runs there and torchcodec is
+        installed, so frames reach the model without a host round trip.
+        
+        Args:
+            source: Camera index or video file path
+        
+        Yields:
+            Tuples of (frame, detections)
+        """
+        if self.model is None:
+            cap = VideoSource(source)
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield frame, self.detect(frame)
+            finally:
+                cap.release()
+            return
+        
+        if self.gpu_preprocess and isinstance(source, str) and gpu_video_available():
+            yield from self._predict_gpu_video(source)
+            return
+        
+        results = self.model.predict(source, stream=True, verbose=False,
+                                     device=self.device, half=self.half,
+                                     classes=self.target_class_ids)
+        for result in results:
+            yield result.orig_img, self._parse_result(result)
+    
+    def _predict_gpu_video(self, path: str) -> Iterator[Tuple[np.ndarray, List[Detection]]]:
+        """Run predict_stream over a file decoded on the GPU by torchcodec"""
+        for batch in gpu_decode_video(path, self.device):
+            images = list(batch)
+            for image, detections in zip(images, self.detect_gpu_batch(images)):
+                # Only the display/alert copy comes back to the host
+                yield tensor_to_bgr(image), detections
+    
+    def _parse_result(self, result, letterbox=None) -> List[Detection]:
+        """
+        Convert a single Ultralytics result into Detection objects
+        
+        Args:
+            result: Ultralytics result
+            letterbox: (scale, pad_x, pad_y, width, height) when the input was
+                letterboxed by _preprocess_fast, to map boxes back to the frame
+        """
+        return self._parse_arrays(result, letterbox).as_list()
+    
+    def _parse_arrays(self, result, letterbox=None) -> DetectionBatch:
+        """Convert a single Ultralytics result into a DetectionBatch (see _parse_result)"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return DetectionBatch.empty()
+                
+        # Three bulk device->host copies instead of per-box scalar reads
+        confidences = boxes.conf.cpu().numpy()
+        class_ids = boxes.cls.cpu().numpy().astype(np.int32)
+        xyxy = boxes.xyxy.cpu().numpy()
+        
+        keep = confidences >= self.confidence_threshold
+        if self._class_mask is not None:
+            keep &= self._class_mask[class_ids]
+        if not keep.any():
+            return DetectionBatch.empty()
+        confidences, class_ids, xyxy = confidences[keep], class_ids[keep], xyxy[keep]
+        
+        if letterbox is not None:
+            scale, pad_x, pad_y, w, h = letterbox
+            xyxy = (xyxy - (pad_x, pad_y, pad_x, pad_y)) / scale
+            np.clip(xyxy, 0, (w, h, w, h), out=xyxy)
+        
+        names = result.names
+        return DetectionBatch(xyxy.astype(np.int32), confidences.astype(np.float32, copy=False),
+                              class_ids, [names[class_id] for class_id in class_ids.tolist()])
+    
+    def set_target_classes(self, class_names: Optional[List[str]]):
+        """
+        Restrict detection to the given class names
+        
+        Args:
+            class_names: Class names to keep, or None/empty to keep all classes
+        """
+        if not class_names or not self._name_to_id:
+            self._class_mask = None
+            self.target_class_ids = None
+            return
+        
+        class_ids = []
+        for name in class_names:
+            class_id = self._name_to_id.get(name)
+            if class_id is None:
+                logger.warning(f"Unknown class name ignored: {name}")
+            else:
+                class_ids.append(class_id)
+        
+        mask = np.zeros(len(self.class_names), dtype=bool)
+        mask[class_ids] = True
+        self._class_mask = mask
+        self.target_class_ids = class_ids
+        self._class_ids_for(class_names)  # Ready for the per-frame filter_by_class calls
+    
+    def filter_by_class(self, detections: Union[List[Detection], DetectionBatch],
+                        class_names: List[str]) -> Union[List[Detection], DetectionBatch]:
+        """Filter detections by class names; a DetectionBatch is filtered with one mask"""
+        target_ids = self._class_ids_for(class_names)
+        if isinstance(detections, DetectionBatch):
+            if target_ids is None:
+                names = frozenset(class_names)
+                return detections.select(np.array([name in names for name in detections.class_names], dtype=bool))
+            return detections.select(self._filter_mask[detections.class_ids])
+        if target_ids is None:
+            names = frozenset(class_names)
+            return [d for d in detections if d.class_name in names]
+        return [d for d in detections if d.class_id in target_ids]
+    
+    def _class_ids_for(self, class_names: List[str]) -> Optional[frozenset]:
+        """
+        Map class names to a set of model class ids, cached for repeated calls
+        
+        Returns None without a model, since fallback detections have no
+        model class ids and must be matched by name.
+        """
+        if not self._name_to_id:
+            return None
+        key = tuple(class_names)
+        if key != self._filter_names:
+            self._filter_ids = frozenset(self._name_to_id[name] for name in key if name in self._name_to_id)
+            self._filter_mask = np.zeros(len(self.class_names), dtype=bool)
+            self._filter_mask[list(self._filter_ids)] = True
+            self._filter_names = key
+        return self._filter_ids
     
     def draw_detections(self, frame: np.ndarray, 
-                       detections: List[Detection]) -> np.ndarray:
-        """Draw bounding boxes on frame"""
-        frame_copy = frame.copy()
+                       detections: List[Detection],
+                       info_text: Optional[str] = None,
+                       inplace: bool = False) -> np.ndarray:
+        """
+        Draw bounding boxes on frame
+        
+        Args:
+            frame: Input frame (modified only when inplace is True)
+            detections: Detections to draw
+            info_text: Optional status line drawn in the top-left corner
+            inplace: Draw straight onto frame instead of a copy; use it when
+                the caller owns the frame and no longer needs it clean
+        
+        Returns:
+            Annotated frame (a copy unless inplace)
+        """
+        return self.draw_detections_into(frame, detections, frame if inplace else None, info_text)
+    
+    def draw_detections_into(self, frame: np.ndarray,
+                             detections: List[Detection],
+                             out_buf: Optional[np.ndarray] = None,
+                             info_text: Optional[str] = None) -> np.ndarray:
+        """
+        Draw bounding boxes into a reusable output buffer
+        
+        Args:
+            frame: Input frame (not modified unless it is out_buf)
+            detections: Detections to draw
+            out_buf: Preallocated array with the frame's shape and dtype; a new
+                array is allocated when it is None or does not match. Passing
+                frame itself draws in place
+            info_text: Optional status line drawn in the top-left corner
+        
+        Returns:
+            The annotated buffer
+        """
+        if out_buf is frame:
+            frame_copy = frame
+        elif out_buf is None or out_buf.shape != frame.shape or out_buf.dtype != frame.dtype:
+            frame_copy = frame.copy()
+        else:
+            np.copyto(out_buf, frame)
+            frame_copy = out_buf
+        class_colors = self._class_colors
+        num_colors = len(class_colors)
+        label_cache = self._label_cache
+        rectangle = cv2.rectangle
+        put_text = cv2.putText
+        font = cv2.FONT_HERSHEY_SIMPLEX
         
         for detection in detections:
             x1, y1, x2, y2 = detection.bbox
+            color = class_colors[detection.class_id % num_colors]
             
             # Draw bounding box
-            cv2.rectangle(frame_copy, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            rectangle(frame_copy, (x1, y1), (x2, y2), color, 2)
             
-            # Draw label
-            label = f"{detection.class_name}: {detection.confidence:.2f}"
-            cv2.putText(frame_copy, label, (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            # Draw label; the text only depends on the class and the rounded confidence
+            key = (detection.class_name, round(detection.confidence * 100))
+            label = label_cache.get(key)
+            if label is None:
+                label = label_cache[key] = f"{key[0]}: {key[1] / 100:.2f}"
+            put_text(frame_copy, label, (x1, y1 - 10), font, 0.5, color, 2)
+        
+        if info_text:
+            cv2.putText(frame_copy, info_text, (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         return frame_copy
     
@@ -3,11 +3,19 @@ System Orchestrator - Coordinates all components
 """
 
 import logging
+import queue
+import threading
+import time
+from collections import deque
+from itertools import compress
 from typing import List, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from src.frame_grabber import FrameGrabber
-from src.object_detector import ObjectDetector
+from src.object_detector import DetectionBatch, ObjectDetector
 from src.alert_system import AlertSystem
+from src.config import CameraConfig
+from src.utils import check_roi_intersection_batch
 
 logger = logging.getLogger(__name__)
 
@@ -29,110 +37,301 @@ class SurveillanceOrchestrator:
             'alert_cooldown_seconds': 30,  # Prevent repeated alerts
             'enable_email_alerts': False,
             'save_alert_frames': True,
-            'alert_frame_dir': 'alerts'
+            'alert_frame_dir': 'alerts',
+            'alert_frame_format': 'jpg',  # 'png' is lossless but far slower to encode
+            'alert_frame_quality': 90,  # JPEG quality of saved alert frames
+            'batch_size': 4,  # Frames per model call in process_batch() on the GPU
+            'detector_stride': 1,  # Decode only every n-th camera frame
+            'target_sample_fps': None,  # Fixed decode rate; None adapts to detection speed
+            'roi': None,  # (x1, y1, x2, y2); only detections touching it count, None for the whole frame
+            'history_max': 10_000,  # Newest detection_history entries kept
+            'record_empty': False  # Also record frames without target detections in the history
         }
         
         self.last_alert_time = None
-        self.detection_history = []
+        self._last_alert_clock = None  # time.monotonic() of the last alert, for the cooldown
+        self.detection_history = deque(maxlen=self.config['history_max'])
+        self._alert_queue: Optional[queue.Queue] = None  # Feeds the alert stage while running
+        self._alert_thread: Optional[threading.Thread] = None
+        self._consume_fps = 0.0  # Smoothed rate of detect_on_frame calls
+        self._last_detect_time = None
+        self._sync_config()
     
-    def initialize(self, camera_source: int = 0, model_name: str = "yolov8n.pt"):
+    def _sync_config(self):
+        """Copy the settings read on every frame out of the config dict"""
+        config = self.config
+        self._target_classes = config['target_classes']
+        self._roi = config['roi']
+        self._cooldown_s = config['alert_cooldown_seconds']
+        self._fixed_sample_fps = config['target_sample_fps']
+        self._record_empty = config['record_empty']
+    
+    def initialize(self, camera_source: int = 0, model_name: str = "yolov8n.pt",
+                   use_frame_grabber: bool = True, camera_config: Optional[CameraConfig] = None):
         """
         Initialize all system components
         
         Args:
             camera_source: Camera index or video file path
             model_name: YOLOv8 model name
+            use_frame_grabber: Open the frame grabber; pass False when frames
+                come from process_stream() instead
+            camera_config: Capture settings (fps, fourcc, driver buffer size)
         """
         try:
             logger.info("Initializing surveillance system...")
             
             # Initialize frame grabber
-            self.frame_grabber = FrameGrabber(source=camera_source, fps=30)
-            if not self.frame_grabber.open():
-                logger.error("Failed to initialize frame grabber")
-                return False
+            if use_frame_grabber:
+                camera_config = camera_config or CameraConfig()
+                self.frame_grabber = FrameGrabber(
+                    source=camera_source,
+                    fps=camera_config.fps,
+                    # One slot more than a batch, so the frame being detected is never reused
+                    buffer_size=max(3, self._batch_size() + 1),
+                    fourcc=camera_config.fourcc,
+                    capture_buffersize=camera_config.buffersize
+                )
+                self._apply_sampling()
+                if not self.frame_grabber.open():
+                    logger.error("Failed to initialize frame grabber")
+                    return False
             
             # Initialize object detector (may fall back to a lightweight detector)
             self.object_detector = ObjectDetector(
                 model_name=model_name,
                 confidence_threshold=self.config['confidence_threshold']
             )
+            self.object_detector.set_target_classes(self.config['target_classes'])
             if self.object_detector.model is None and not getattr(self.object_detector, 'has_fallback', False):
                 logger.warning("Object detector not available (YOLO/PyTorch missing). Running without detection or using simple fallback.")
             
             logger.info("Surveillance system initialized successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Initialization error: {e}")
             return False
     
-    def process_frame(self):
+    def process_frame(self, timeout: Optional[float] = None):
         """
         Process a single frame
         
+        Args:
+            timeout: Wait up to this many seconds for a frame newer than the
+                last one; None returns the current frame immediately
+        
         Returns:
             Tuple of (frame, detections)
         """
-        if self.frame_grabber is None:
+        frame = self.capture_frame(timeout)
+        if frame is None:
             return None, []
         
-        ret, frame = self.frame_grabber.get_frame()
-        if not ret:
+        return frame, self.detect_on_frame(frame)
+    
+    def sample_history_at(self, seconds: float, timeout: float = 1.0):
+        """
+        Detect on a recorded video at a given position
+        
+        Uses FrameGrabber.seek_approx(), so the frame may come from the
+        keyframe shortly before the requested time.
+        
+        Args:
+            seconds: Position in the video file
+            timeout: Seconds to wait for the seek and for the frame
+        
+        Returns:
+            Tuple of (frame, detections); (None, []) if the source can't seek
+        """
+        if self.frame_grabber is None or not self.frame_grabber.seek_approx(seconds, timeout):
             return None, []
+        return self.process_frame(timeout)
+    
+    def process_batch(self, timeout: Optional[float] = None):
+        """
+        Detect on every frame captured since the last call with one model call
         
-        # Run detection
-        detections = self.object_detector.detect(frame)
+        Args:
+            timeout: Wait up to this many seconds for a new frame; None
+                returns immediately
         
+        Returns:
+            List of (frame, detections) tuples, oldest first
+        """
+        if self.frame_grabber is None or self.object_detector is None:
+            return []
+        
+        frames = self.frame_grabber.get_new_frames(self._batch_size(), timeout)
+        if not frames:
+            return []
+        
+        results = self.object_detector.detect_batch(frames)
+        self._update_consume_rate(len(frames))
+        return [(frame, self._process_detections(frame, detections))
+                for frame, detections in zip(frames, results)]
+    
+    def use_batches(self) -> bool:
+        """
+        Check whether process_batch() should be preferred over process_frame()
+        
+        Only on the GPU: on the CPU a batch costs as much as its frames one
+        by one and just delays the newest result.
+        """
+        return (self._batch_size() > 1 and self.object_detector is not None
+                and self.object_detector.device is not None)
+    
+    def _batch_size(self) -> int:
+        """Configured batch size, capped to what the TensorRT engine accepts"""
+        return min(max(1, self.config['batch_size']), ObjectDetector.MAX_BATCH)
+    
+    def capture_frame(self, timeout: Optional[float] = None):
+        """
+        Fetch the latest frame from the frame grabber
+        
+        Args:
+            timeout: Wait up to this many seconds for a new frame; None
+                returns the current frame immediately
+        
+        Returns:
+            Frame, or None if no frame is available
+        """
+        if self.frame_grabber is None:
+            return None
+        
+        if timeout is None:
+            ret, frame = self.frame_grabber.get_frame()
+        else:
+            ret, frame = self.frame_grabber.grab_latest(timeout)
+        return frame if ret else None
+    
+    def detect_on_frame(self, frame):
+        """
+        Run detection on a captured frame, then filter, alert and record it
+        
+        Args:
+            frame: Frame from capture_frame()
+        
+        Returns:
+            List of target detections
+        """
+        detections = self.object_detector.detect_arrays(frame, gated=True)
+        if self.frame_grabber is not None:
+            self._update_consume_rate()
+        return self._process_detections(frame, detections)
+    
+    def _update_consume_rate(self, frames: int = 1):
+        """Tell the frame grabber how fast frames are being consumed"""
+        if self._fixed_sample_fps:
+            return
+        now = time.perf_counter()
+        if self._last_detect_time is not None and now > self._last_detect_time:
+            fps = frames / (now - self._last_detect_time)
+            self._consume_fps = fps if not self._consume_fps else 0.9 * self._consume_fps + 0.1 * fps
+            # Decode somewhat faster than detection so a fresh frame is always waiting
+            self.frame_grabber.set_consume_fps(1.5 * self._consume_fps)
+        self._last_detect_time = now
+    
+    def process_stream(self, source):
+        """
+        Process a whole video source with the detector's streaming predictor
+        
+        Args:
+            source: Camera index or video file path
+        
+        Yields:
+            Tuples of (frame, detections)
+        """
+        if self.object_detector is None:
+            return
+        
+        for frame, detections in self.object_detector.predict_stream(source):
+            if not self.is_running:
+                break
+            yield frame, self._process_detections(frame, detections)
+    
+    def _process_detections(self, frame, detections):
+        """Filter detections (a list or a DetectionBatch), trigger alerts and record history"""
         # Filter by target classes
-        target_detections = self.object_detector.filter_by_class(
-            detections,
-            self.config['target_classes']
-        )
+        target_detections = self.object_detector.filter_by_class(detections, self._target_classes)
+        is_batch = isinstance(target_detections, DetectionBatch)
+        roi = self._roi
+        if len(target_detections) and roi is not None:
+            if is_batch:
+                mask = check_roi_intersection_batch(target_detections.bboxes, roi)
+                target_detections = target_detections.select(mask)
+            else:
+                bboxes = np.array([d.bbox for d in target_detections])
+                mask = check_roi_intersection_batch(bboxes, roi)
+                target_detections = list(compress(target_detections, mask))
+        if is_batch:
+            # Only the detections that survived filtering become objects
+            target_detections = target_detections.as_list()
         
         # Check if alert should be triggered
         if target_detections:
             self._handle_detection(frame, target_detections)
         
         # Store in history
-        self.detection_history.append({
-            'timestamp': datetime.now(),
-            'detections': target_detections,
-            'detection_count': len(target_detections),
-            'frame_info': self.frame_grabber.get_frame_info()
-        })
+        if target_detections or self._record_empty:
+            self.detection_history.append({
+                'timestamp': datetime.now(),
+                'detections': target_detections,
+                'detection_count': len(target_detections),
+                'frame_info': self.frame_grabber.get_frame_info() if self.frame_grabber else {}
+            })
         
-        return frame, target_detections
+        return target_detections
     
     def _handle_detection(self, frame, detections):
         """Handle object detection"""
         # Check alert cooldown
-        if self.last_alert_time and \
-           (datetime.now() - self.last_alert_time).seconds < \
-           self.config['alert_cooldown_seconds']:
+        now = time.monotonic()
+        if self._last_alert_clock is not None and now - self._last_alert_clock < self._cooldown_s:
             return
         
+        self._last_alert_clock = now
         self.last_alert_time = datetime.now()
         
-        # Log detection
-        logger.warning(f"Alert triggered! Detected {len(detections)} object(s)")
-        for det in detections:
-            logger.warning(f"  - {det.class_name} ({det.confidence:.2f})")
+        # Log detection as one record rather than one per object
+        if logger.isEnabledFor(logging.WARNING):
+            lines = "\n".join(f"  - {det.class_name} ({det.confidence:.2f})" for det in detections)
+            logger.warning(f"Alert triggered! Detected {len(detections)} object(s)\n{lines}")
         
+        if self._alert_queue is not None:
+            # Disk and SMTP work happens on the alert stage; the frame is only lent to us
+            self._alert_queue.put((frame.copy(), detections))
+        else:
+            self._dispatch_alert(frame, detections, wait=False)
+    
+    def _dispatch_alert(self, frame, detections, wait: bool = True):
+        """Save the alert frame and send the email alert"""
         # Save alert frame
         if self.config['save_alert_frames']:
-            frame_path = self.alert_system.save_alert_frame(
-                frame,
-                self.config['alert_frame_dir']
-            )
-        else:
-            frame_path = None
+            save = self.alert_system.save_alert_frame if wait else self.alert_system.save_alert_frame_async
+            save(frame, self.config['alert_frame_dir'],
+                 self.config['alert_frame_format'], self.config['alert_frame_quality'])
         
         # Send email alert
         if self.config['enable_email_alerts']:
             subject = f"Security Alert: {len(detections)} Objects Detected"
             message = self._create_alert_message(detections)
-            self.alert_system.send_alert_email(subject, message, frame_path)
+            # Attach the in-memory frame; no need to read the saved file back
+            if wait:
+                self.alert_system.send_alert_email(subject, message, attachment_frame=frame)
+            else:
+                self.alert_system.send_alert_email_async(subject, message, attachment_frame=frame)
+    
+    def _alert_worker(self):
+        """Alert stage: run alert side effects off the detection thread"""
+        while True:
+            item = self._alert_queue.get()
+            if item is None:
+                break
+            try:
+                self._dispatch_alert(*item)
+            except Exception as e:
+                logger.error(f"Alert handling failed: {e}")
     
     def _create_alert_message(self, detections) -> str:
         """Create alert message"""
@@ -148,31 +347,61 @@ class SurveillanceOrchestrator:
     
     def start(self):
         """Start the surveillance system"""
-        if self.frame_grabber is None:
+        if self.frame_grabber is None and self.object_detector is None:
             logger.error("System not initialized")
             return False
         
         self.is_running = True
+        # Pipeline: the grabber thread captures, the caller detects, this thread alerts
+        if self._alert_thread is None:
+            self._alert_queue = queue.Queue(maxsize=4)
+            self._alert_thread = threading.Thread(target=self._alert_worker, daemon=True)
+            self._alert_thread.start()
         logger.info("Surveillance system started")
         return True
     
     def stop(self):
         """Stop the surveillance system"""
         self.is_running = False
+        if self._alert_thread is not None:
+            self._alert_queue.put(None)  # Pending alerts are still handled first
+            self._alert_thread.join(timeout=30)
+            self._alert_queue = None
+            self._alert_thread = None
         if self.frame_grabber:
             self.frame_grabber.release()
+        self.alert_system.close()
         logger.info("Surveillance system stopped")
     
     def configure(self, **kwargs):
-        """Update configuration"""
+        """Update configuration; use this rather than writing to self.config"""
         for key, value in kwargs.items():
             if key in self.config:
                 self.config[key] = value
                 logger.info(f"Configuration updated: {key} = {value}")
+        self._sync_config()
+        
+        if 'target_classes' in kwargs and self.object_detector is not None:
+            self.object_detector.set_target_classes(self.config['target_classes'])
+        if 'history_max' in kwargs:
+            self.detection_history = deque(self.detection_history, maxlen=self.config['history_max'])
+        if 'detector_stride' in kwargs or 'target_sample_fps' in kwargs:
+            self._apply_sampling()
+    
+    def _apply_sampling(self):
+        """Tell the frame grabber which frames are worth decoding"""
+        if self.frame_grabber is None:
+            return
+        self.frame_grabber.set_stride(self.config['detector_stride'])
+        if self.config['target_sample_fps']:
+            self.frame_grabber.set_consume_fps(self.config['target_sample_fps'])
     
     def set_target_classes(self, classes: List[str]):
         """Set target detection classes"""
         self.config['target_classes'] = classes
+        self._target_classes = classes
+        if self.object_detector is not None:
+            self.object_detector.set_target_classes(classes)
         logger.info(f"Target classes set to: {classes}")
     
     def set_email_config(self, sender_email: str, sender_password: str, 
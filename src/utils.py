@@ -2,16 +2,48 @@
 Utility functions for SmartSurveillance
 """
 
+import math
+import time
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import Tuple
+from typing import Iterable, Iterator, Optional, Tuple
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except Exception:  # Package missing or libjpeg-turbo not found
+    _turbo_jpeg = None
 
-def resize_frame(frame: np.ndarray, height: int = None, width: int = None) -> np.ndarray:
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import pyvips
+except (ImportError, OSError):  # Package missing or libvips not found
+    pyvips = None
+
+# Encoder settings for saved outputs; JPEG quality 85 is visually lossless for review
+JPEG_WRITE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85, cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+                     cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]  # Fast, still lossless
+
+# Decoder downscale factors and their OpenCV flags, largest first
+_REDUCED_READ_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                       (4, cv2.IMREAD_REDUCED_COLOR_4),
+                       (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def resize_frame(frame: np.ndarray, height: int = None, width: int = None,
+                 backend: str = 'cv2') -> np.ndarray:
     """
     Resize frame while maintaining aspect ratio
     
@@ -19,6 +51,9 @@ def resize_frame(frame: np.ndarray, height: int = None, width: int = None) -> np
         frame: Input image
         height: Target height (width calculated if provided)
         width: Target width (height calculated if provided)
+        backend: 'cv2' (INTER_AREA), 'pil' (Pillow, or Pillow-SIMD when
+            installed in its place) or 'vips' (pyvips); falls back to cv2
+            when the library is missing
         
     Returns:
         Resized frame
@@ -35,27 +70,98 @@ def resize_frame(frame: np.ndarray, height: int = None, width: int = None) -> np
         ratio = height / h
         width = int(w * ratio)
     
+    if backend == 'pil' and Image is not None:
+        # Pillow's BILINEAR widens its filter when shrinking, so it antialiases like INTER_AREA.
+        # np.array (not asarray) so callers get a writable frame to draw on
+        return np.array(Image.fromarray(frame).resize((width, height), Image.BILINEAR))
+    if backend == 'vips' and pyvips is not None:
+        bands = frame.shape[2] if frame.ndim == 3 else 1
+        image = pyvips.Image.new_from_memory(np.ascontiguousarray(frame).data, w, h, bands, 'uchar')
+        image = image.resize(width / w, vscale=height / h)
+        out = np.frombuffer(bytearray(image.write_to_memory()), dtype=np.uint8)
+        out = out.reshape(image.height, image.width, bands)
+        return out if frame.ndim == 3 else out[:, :, 0]
+    
     return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
 
 
+_timestamp_cache = [-1, ""]  # [epoch second, formatted text]
+
+
+@lru_cache(maxsize=64)
+def _text_overlay(text: str, scale: float, color: Tuple[int, int, int], thickness: int):
+    """
+    Render text once into a blendable overlay
+    
+    Returns:
+        Tuple of (inverse alpha, colour premultiplied by alpha, pad, ascent)
+    """
+    (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    pad = thickness + 2  # Strokes reach past the measured box by about the thickness
+    size = (h + baseline + 2 * pad, w + 2 * pad)
+    alpha = cv2.putText(np.zeros(size, dtype=np.uint8), text, (pad, h + pad),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+    alpha = cv2.merge([alpha] * 3)
+    premultiplied = cv2.multiply(np.full(size + (3,), color, dtype=np.uint8), alpha, scale=1 / 255)
+    return cv2.bitwise_not(alpha), premultiplied, pad, h
+
+
+def put_text_cached(frame: np.ndarray, text: str, position: Tuple[int, int], scale: float,
+                    color: Tuple[int, int, int], thickness: int) -> np.ndarray:
+    """
+    cv2.putText for text that repeats across frames
+    
+    The glyphs are rasterised once per distinct text and then alpha-blended
+    into the frame, which is about twice as fast as drawing them again.
+    The first frame with a new text is slower than putText, so use this
+    only for text that stays the same for many frames.
+    
+    Args:
+        frame: BGR uint8 frame, drawn on in place
+        text: Text to draw
+        position: (x, y) of the baseline start, as for cv2.putText
+        scale: Font scale
+        color: BGR text colour
+        thickness: Stroke thickness
+        
+    Returns:
+        The frame
+    """
+    if frame.dtype == np.uint8 and frame.ndim == 3 and frame.shape[2] == 3:
+        inverse_alpha, premultiplied, pad, ascent = _text_overlay(text, scale, tuple(color), thickness)
+        x0, y0 = position[0] - pad, position[1] - ascent - pad
+        h, w = inverse_alpha.shape[:2]
+        if x0 >= 0 and y0 >= 0 and x0 + w <= frame.shape[1] and y0 + h <= frame.shape[0]:
+            roi = frame[y0:y0 + h, x0:x0 + w]
+            cv2.multiply(roi, inverse_alpha, dst=roi, scale=1 / 255)
+            cv2.add(roi, premultiplied, dst=roi)
+            return frame
+    # Clipped at the frame edge or not a BGR frame
+    cv2.putText(frame, text, position, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+    return frame
+
+
 def add_timestamp(frame: np.ndarray) -> np.ndarray:
     """
     Add timestamp to frame
     
+    The text only changes once a second, so it is formatted and rendered
+    once per second and reused for every frame in between.
+    
     Args:
         frame: Input frame
         
     Returns:
         Frame with timestamp
     """
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cv2.putText(frame, timestamp, (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    return frame
+    second = int(time.time())
+    if second != _timestamp_cache[0]:
+        _timestamp_cache[:] = [second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))]
+    return put_text_cached(frame, _timestamp_cache[1], (10, 30), 1, (0, 255, 0), 2)
 
 
-def add_info_text(frame: np.ndarray, text: str, position: Tuple[int, int] = (10, 60)) -> np.ndarray:
+def add_info_text(frame: np.ndarray, text: str, position: Tuple[int, int] = (10, 60),
+                  static: bool = False) -> np.ndarray:
     """
     Add custom text to frame
     
@@ -63,10 +169,14 @@ def add_info_text(frame: np.ndarray, text: str, position: Tuple[int, int] = (10,
         frame: Input frame
         text: Text to add
         position: (x, y) position
+        static: True if the same text is drawn on many frames (labels, camera
+            names), to reuse its rendering; leave False for per-frame counters
         
     Returns:
         Frame with text
     """
+    if static:
+        return put_text_cached(frame, text, position, 0.7, (0, 255, 0), 2)
     cv2.putText(frame, text, position,
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
     return frame
@@ -107,6 +217,25 @@ def check_roi_intersection(bbox: Tuple[int, int, int, int],
     return not (x2_bb < x1_roi or x2_roi < x1_bb or y2_bb < y1_roi or y2_roi < y1_bb)
 
 
+def check_roi_intersection_batch(bboxes: np.ndarray,
+                                 roi: Tuple[int, int, int, int]) -> np.ndarray:
+    """
+    Vectorized check_roi_intersection over many bounding boxes
+    
+    Args:
+        bboxes: (N, 4) array of (x1, y1, x2, y2) bounding boxes
+        roi: (x1, y1, x2, y2) region of interest
+        
+    Returns:
+        Boolean mask of length N, True where the box intersects the ROI
+    """
+    bboxes = np.asarray(bboxes).reshape(-1, 4)
+    x1_roi, y1_roi, x2_roi, y2_roi = roi
+    
+    return ~((bboxes[:, 2] < x1_roi) | (x2_roi < bboxes[:, 0]) |
+             (bboxes[:, 3] < y1_roi) | (y2_roi < bboxes[:, 1]))
+
+
 def create_directories():
     """Create necessary directories"""
     directories = ['alerts', 'logs', 'config']
@@ -115,6 +244,160 @@ def create_directories():
         logger.info(f"Ensured directory exists: {directory}")
 
 
+def exif_orientation(filepath) -> Optional[int]:
+    """
+    Read the EXIF Orientation tag of an image from its header
+    
+    Args:
+        filepath: Path to image file (str or Path)
+        
+    Returns:
+        Orientation 1-8 (1 when the tag is absent), or None if it could not be read
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(str(filepath)) as probe:  # Reads the header only
+            return probe.getexif().get(0x0112, 1)
+    except Exception:
+        return None
+
+
+def fast_imread(filepath, min_side: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Read an image as BGR, decoding JPEGs with libjpeg-turbo when available
+    
+    Args:
+        filepath: Path to image file (str or Path)
+        min_side: If set, let the decoder downscale by 2, 4 or 8 as long as
+            the shorter side stays at least this large (preview quality)
+        
+    Returns:
+        Image, or None if it could not be read
+    """
+    filepath = str(filepath)
+    if min_side and Image is not None:
+        try:
+            with Image.open(filepath) as probe:  # Reads the header only
+                short_side = min(probe.size)
+            for factor, flag in _REDUCED_READ_FLAGS:
+                if short_side >= factor * min_side:
+                    return cv2.imread(filepath, flag)
+        except Exception:
+            pass  # Unknown header; fall through to a full decode
+    
+    # TurboJPEG ignores EXIF orientation, so rotated photos go through OpenCV,
+    # which applies it
+    if (_turbo_jpeg is not None and filepath.lower().endswith(('.jpg', '.jpeg'))
+            and exif_orientation(filepath) == 1):
+        try:
+            with open(filepath, 'rb') as f:
+                return _turbo_jpeg.decode(f.read(), pixel_format=TJPF_BGR)
+        except Exception:
+            pass  # Missing or not really a JPEG; let OpenCV handle it
+    return cv2.imread(filepath)
+
+
+def imwrite_params(filepath) -> list:
+    """Pick encoder parameters from the output file extension"""
+    ext = Path(filepath).suffix.lower()
+    if ext in ('.jpg', '.jpeg'):
+        return JPEG_WRITE_PARAMS
+    if ext == '.png':
+        return PNG_WRITE_PARAMS
+    return []
+
+
+def save_image(filepath, image: np.ndarray, params: Optional[list] = None) -> bool:
+    """
+    Write an image with encoder settings tuned for its format
+    
+    Args:
+        filepath: Output path (str or Path)
+        image: Image to write
+        params: cv2.imwrite parameters overriding the per-format defaults
+        
+    Returns:
+        True if the file was written
+    """
+    if params is None:
+        params = imwrite_params(filepath)
+    return cv2.imwrite(str(filepath), image, params)
+
+
+def gpu_jpeg_available() -> bool:
+    """Check whether torchvision can decode JPEGs on a CUDA device (nvJPEG)"""
+    try:
+        import torch
+        from torchvision.io import decode_jpeg  # noqa: F401
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def gpu_decode_jpegs(paths: Iterable, device: int = 0) -> list:
+    """
+    Decode JPEG files on the GPU with nvJPEG
+    
+    EXIF orientation is not applied; send rotated photos (exif_orientation
+    other than 1) through fast_imread instead.
+    
+    Args:
+        paths: JPEG file paths (str or Path)
+        device: CUDA device index
+        
+    Returns:
+        RGB uint8 CUDA tensors of shape (3, H, W); None for unreadable files
+    """
+    import torch
+    from torchvision.io import ImageReadMode, decode_jpeg, read_file
+    
+    cuda = torch.device('cuda', device)
+    images = []
+    for path in paths:
+        try:
+            images.append(decode_jpeg(read_file(str(path)), mode=ImageReadMode.RGB, device=cuda))
+        except Exception as e:
+            logger.warning(f"GPU decode failed for {path}: {e}")
+            images.append(None)
+    return images
+
+
+def gpu_video_available() -> bool:
+    """Check whether torchcodec can decode video on a CUDA device (NVDEC)"""
+    try:
+        import torch
+        from torchcodec.decoders import VideoDecoder  # noqa: F401
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def gpu_decode_video(path: str, device: int = 0, batch_size: int = 8) -> Iterator:
+    """
+    Decode a video file on the GPU with torchcodec, a batch at a time
+    
+    Args:
+        path: Video file path
+        device: CUDA device index
+        batch_size: Frames decoded per step
+        
+    Yields:
+        RGB uint8 CUDA tensors of shape (N, 3, H, W)
+    """
+    from torchcodec.decoders import VideoDecoder
+    
+    decoder = VideoDecoder(str(path), device=f"cuda:{device}", dimension_order='NCHW')
+    total = len(decoder)
+    for start in range(0, total, batch_size):
+        yield decoder.get_frames_in_range(start, min(start + batch_size, total)).data
+
+
+def tensor_to_bgr(image) -> np.ndarray:
+    """Copy an RGB (3, H, W) tensor back to the host as a BGR image"""
+    return image.flip(0).permute(1, 2, 0).contiguous().cpu().numpy()
+
+
 def validate_image_file(filepath: str) -> bool:
     """
     Validate if file is a valid image
@@ -167,10 +450,29 @@ def get_frame_dimensions(frame: np.ndarray) -> Tuple[int, int]:
     return h, w
 
 
+BOX_BLUR_MIN_KERNEL = 11  # From here three box passes beat cv2.GaussianBlur
+
+
+@lru_cache(maxsize=32)
+def _box_blur_widths(kernel_size: int, passes: int = 3) -> Tuple[int, ...]:
+    """Box widths whose repeated application matches GaussianBlur's default sigma"""
+    sigma = 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8  # What GaussianBlur uses for sigma=0
+    lower = int(math.sqrt(12 * sigma * sigma / passes + 1))
+    if lower % 2 == 0:
+        lower -= 1
+    # Mix odd widths lower and lower + 2 so the summed variance hits sigma^2
+    n_lower = round((12 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes)
+                    / (-4 * lower - 4))
+    return tuple(lower if i < n_lower else lower + 2 for i in range(passes))
+
+
 def apply_blur(frame: np.ndarray, kernel_size: int = 5) -> np.ndarray:
     """
     Apply Gaussian blur to frame
     
+    Large kernels are approximated by three box filters, whose cost does
+    not grow with the kernel size.
+    
     Args:
         frame: Input frame
         kernel_size: Blur kernel size (must be odd)
@@ -180,20 +482,29 @@ def apply_blur(frame: np.ndarray, kernel_size: int = 5) -> np.ndarray:
     """
     if kernel_size % 2 == 0:
         kernel_size += 1
-    return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+    if kernel_size < BOX_BLUR_MIN_KERNEL:
+        return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+    
+    out = frame
+    for width in _box_blur_widths(kernel_size):
+        out = cv2.blur(out, (width, width))
+    return out
 
 
-def apply_edge_detection(frame: np.ndarray) -> np.ndarray:
+def apply_edge_detection(frame: np.ndarray, gray: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Apply Canny edge detection
     
     Args:
         frame: Input frame
+        gray: Grayscale version of the frame if already available
+            (e.g. FrameGrabber.get_gray()), to skip the conversion
         
     Returns:
         Edge-detected frame
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     edges = cv2.Canny(gray, 100, 200)
     return edges
 
@@ -202,6 +513,9 @@ def compare_frames(frame1: np.ndarray, frame2: np.ndarray) -> float:
     """
     Compare two frames and return similarity score
     
+    Grayscale frames work too and read a third of the data; pass cached
+    ones (e.g. from FrameGrabber.get_gray()) for cheap motion checks.
+    
     Args:
         frame1: First frame
         frame2: Second frame
@@ -212,8 +526,41 @@ def compare_frames(frame1: np.ndarray, frame2: np.ndarray) -> float:
     if frame1.shape != frame2.shape:
         return 0.0
     
-    # Calculate mean squared error
-    mse = np.mean((frame1.astype(float) - frame2.astype(float)) ** 2)
+    # Mean squared error in one SIMD pass, without float copies of the frames
+    mse = cv2.norm(frame1, frame2, cv2.NORM_L2SQR) / frame1.size
     # Convert MSE to similarity score
     similarity = np.exp(-mse / (255 ** 2))
     return float(similarity)
+
+
+def prefetch_images(paths: Iterable, max_workers: int = 4, window: int = 8,
+                    min_side: Optional[int] = None) -> Iterator[Tuple[object, Optional[np.ndarray]]]:
+    """
+    Decode images on a thread pool while the caller works on earlier ones
+    
+    At most `window` images are in flight at once, so memory stays bounded
+    however long the path list is. Decoding releases the GIL.
+    
+    Args:
+        paths: Image paths (str or Path)
+        max_workers: Number of decoding threads
+        window: Maximum number of images read ahead
+        min_side: Passed to fast_imread for reduced-resolution decoding
+    
+    Yields:
+        Tuples of (path, image), in input order; image is None if unreadable
+    """
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append((path, executor.submit(fast_imread, path, min_side)))
+            if len(pending) >= window:
+                break
+        
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(fast_imread, next_path, min_side)))
+            yield path, future.result()
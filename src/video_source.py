@@ -0,0 +1,156 @@
+"""
+Video Source Module - Decodes video files with PyAV when available
+Falls back to cv2.VideoCapture for cameras, streams, or when PyAV is missing
+"""
+
+import os
+import cv2
+import logging
+from typing import Optional, Tuple, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+class VideoSource:
+    """
+    Drop-in replacement for cv2.VideoCapture on video files
+    
+    Supports the subset of the VideoCapture API used in this project:
+    isOpened, read, grab, retrieve, get, set and release. grab() decodes
+    the compressed frame but defers the costly colour conversion to
+    retrieve(), so skipped frames stay cheap.
+    """
+    
+    def __init__(self, source: Union[int, str]):
+        """
+        Open a video source
+        
+        Args:
+            source: Camera index or video file path
+        """
+        self.source = source
+        self._cap = None
+        self._container = None
+        self._stream = None
+        self._frames = None
+        self._pending = None
+        self._frame_index = 0
+        
+        if av is not None and isinstance(source, str) and os.path.isfile(source):
+            self._open_pyav(source)
+        
+        self.uses_pyav = self._container is not None
+        if not self.uses_pyav:
+            self._cap = cv2.VideoCapture(source)
+    
+    def _open_pyav(self, path: str):
+        """Open a video file with PyAV using multi-threaded decoding"""
+        try:
+            container = av.open(path)
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            stream.thread_count = max(1, (os.cpu_count() or 2) // 2)
+            self._container = container
+            self._stream = stream
+            self._frames = container.decode(stream)
+            logger.info(f"Decoding {path} with PyAV ({stream.codec_context.name})")
+        except Exception as e:
+            logger.warning(f"PyAV could not open {path}: {e}. Falling back to OpenCV.")
+            self._container = None
+    
+    def isOpened(self) -> bool:
+        """Check whether the source is open"""
+        if self.uses_pyav:
+            return self._frames is not None
+        return self._cap.isOpened()
+    
+    def grab(self) -> bool:
+        """Advance to the next frame without converting it"""
+        if not self.uses_pyav:
+            return self._cap.grab()
+        if self._frames is None:
+            return False
+        try:
+            self._pending = next(self._frames)
+            self._frame_index += 1
+            return True
+        except (StopIteration, av.error.EOFError):
+            self._pending = None
+            return False
+    
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Convert the last grabbed frame to a BGR array, into image when it fits"""
+        if not self.uses_pyav:
+            return self._cap.retrieve(image)
+        if self._pending is None:
+            return False, None
+        frame = self._pending.to_ndarray(format='bgr24')
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+    
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Grab and convert the next frame"""
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+    
+    def get(self, prop_id: int) -> float:
+        """Query a capture property (cv2.CAP_PROP_*)"""
+        if not self.uses_pyav:
+            return self._cap.get(prop_id)
+        
+        stream = self._stream
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(stream.average_rate or 0)
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(stream.codec_context.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(stream.codec_context.height)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(stream.frames)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._frame_index)
+        return 0.0
+    
+    def set(self, prop_id: int, value) -> bool:
+        """Set a capture property; PyAV-backed files only support CAP_PROP_POS_MSEC"""
+        if not self.uses_pyav:
+            return self._cap.set(prop_id, value)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return self._seek(value / 1000.0)
+        return False
+    
+    def _seek(self, seconds: float) -> bool:
+        """Jump to the keyframe at or before a position; decoding resumes from there"""
+        if self._container is None:
+            return False
+        stream = self._stream
+        try:
+            target = int(seconds / stream.time_base) + (stream.start_time or 0)
+            self._container.seek(target, stream=stream, backward=True, any_frame=False)
+        except Exception as e:
+            logger.warning(f"Seek to {seconds:.2f}s failed: {e}")
+            return False
+        self._frames = self._container.decode(stream)
+        self._pending = None
+        self._frame_index = int(seconds * float(stream.average_rate or 0))  # Approximate
+        return True
+    
+    def release(self):
+        """Close the source"""
+        if self.uses_pyav:
+            if self._container is not None:
+                self._container.close()
+                self._container = None
+            self._frames = None
+            self._pending = None
+        else:
+            self._cap.release()
@@ -2,12 +2,19 @@
 Tests for SmartSurveillance components
 """
 
+import os
+import tempfile
+import threading
 import unittest
+import cv2
 import numpy as np
-from src.object_detector import ObjectDetector, Detection
+from src.object_detector import ObjectDetector, Detection, DetectionBatch
 from src.frame_grabber import FrameGrabber
 from src.alert_system import AlertSystem
 from src.orchestrator import SurveillanceOrchestrator
+from src.video_source import VideoSource
+from src.detection_server import DetectionServer, request_detection
+from src.utils import exif_orientation, fast_imread
 
 class TestFrameGrabber(unittest.TestCase):
     """Test frame grabber functionality"""
@@ -24,6 +31,40 @@ class TestFrameGrabber(unittest.TestCase):
         grabber = FrameGrabber(source=0)
         # Info should be empty before opening
         self.assertEqual(grabber.get_frame_info(), {})
+    
+    def test_grab_latest_before_open(self):
+        """Test grab_latest fails cleanly before the source is opened"""
+        grabber = FrameGrabber(source=0)
+        self.assertEqual(grabber.grab_latest(timeout=0.01), (False, None))
+        self.assertEqual(grabber.snapshot(2), [])
+    
+    def test_seek_approx(self):
+        """Test seeking a video file only returns frames from after the seek"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clip.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+            for _ in range(20):
+                writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+            writer.release()
+            
+            grabber = FrameGrabber(source=path)
+            self.assertFalse(grabber.seek_approx(1.0))
+            self.assertTrue(grabber.open())
+            try:
+                self.assertTrue(grabber.seek_approx(1.0))
+                ret, frame = grabber.grab_latest(timeout=1.0)
+                self.assertTrue(ret)
+                self.assertEqual(frame.shape, (48, 64, 3))
+            finally:
+                grabber.release()
+            self.assertFalse(FrameGrabber(source=0).seek_approx(1.0))
+    
+    def test_video_source_missing_file(self):
+        """Test video source reports a missing file as not opened"""
+        source = VideoSource("does_not_exist.mp4")
+        self.assertFalse(source.isOpened())
+        self.assertEqual(source.read(), (False, None))
+        source.release()
 
 
 class TestObjectDetection(unittest.TestCase):
@@ -47,6 +88,46 @@ class TestObjectDetection(unittest.TestCase):
         self.assertIsNotNone(detector)
         self.assertEqual(detector.confidence_threshold, 0.5)
 
+    def test_detect_batch(self):
+        """Test batch detection returns one result list per frame"""
+        detector = ObjectDetector()
+        frames = [np.zeros((120, 160, 3), dtype=np.uint8) for _ in range(3)]
+        results = detector.detect_batch(frames)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(detector.detect_batch([]), [])
+    
+    def test_detection_batch_filter(self):
+        """Test class filtering on parallel arrays matches the list form"""
+        dets = [Detection("person", 0.5, (10, 20, 30, 40), 0),
+                Detection("car", 0.75, (50, 60, 70, 80), 2)]
+        batch = DetectionBatch.from_detections(dets)
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch.as_list(), dets)
+        filtered = ObjectDetector().filter_by_class(batch, ["car"])
+        self.assertEqual(filtered.as_list(), [dets[1]])
+        self.assertEqual(len(DetectionBatch.empty()), 0)
+    
+    def test_quick_reject(self):
+        """Test uniform frames are rejected only when a threshold is set"""
+        flat = np.full((480, 640, 3), 128, dtype=np.uint8)
+        noisy = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        self.assertFalse(ObjectDetector().quick_reject(flat))
+        detector = ObjectDetector(reject_threshold=5.0)
+        self.assertTrue(detector.quick_reject(flat))
+        self.assertFalse(detector.quick_reject(noisy))
+    
+    def test_draw_detections_inplace(self):
+        """Test drawing copies by default and reuses the frame when asked"""
+        detector = ObjectDetector()
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        dets = [Detection("person", 0.87, (10, 20, 60, 90), 0)]
+        out = detector.draw_detections(frame, dets)
+        self.assertIsNot(out, frame)
+        self.assertFalse(frame.any())
+        self.assertTrue(out.any())
+        self.assertIs(detector.draw_detections(frame, dets, inplace=True), frame)
+        self.assertTrue(np.array_equal(frame, out))
+
 
 class TestAlertSystem(unittest.TestCase):
     """Test alert system functionality"""
@@ -103,6 +184,39 @@ class TestIntegration(unittest.TestCase):
         self.assertIn('is_running', stats)
         self.assertIn('config', stats)
         self.assertIn('total_detections', stats)
+    
+    def test_detection_server_round_trip(self):
+        """Test a request to a running detection server"""
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path = os.path.join(tmp, "frame.jpg")
+            cv2.imwrite(image_path, np.zeros((120, 160, 3), dtype=np.uint8))
+            
+            with DetectionServer(ObjectDetector(), port=0) as server:
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                response = request_detection(image_path, port=server.server_address[1])
+                server.shutdown()
+            
+            self.assertTrue(response['ok'])
+            self.assertIsInstance(response['detections'], list)
+            self.assertTrue(os.path.exists(response['output_path']))
+        
+        self.assertIsNone(request_detection("missing.jpg", port=1))
+
+
+class TestUtils(unittest.TestCase):
+    """Test image helpers"""
+    
+    def test_fast_imread_exif_orientation(self):
+        """Test JPEGs tagged as rotated come back upright"""
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "portrait.jpg")
+            exif = Image.Exif()
+            exif[0x0112] = 6  # Stored landscape, shown rotated 90 degrees clockwise
+            Image.new("RGB", (64, 32)).save(path, exif=exif)
+            
+            self.assertEqual(exif_orientation(path), 6)
+            self.assertEqual(fast_imread(path).shape, (64, 32, 3))
 
 
 if __name__ == '__main__':
@@ -6,6 +6,7 @@ Checks if SmartSurveillance is properly installed and ready to run
 
 import sys
 import subprocess
+import importlib.util
 from pathlib import Path
 
 class Colors:
@@ -38,15 +39,20 @@ def check_python_version():
 
 
 def check_package(package_name, import_name=None):
-    """Check if a Python package is installed"""
+    """Check if a Python package is installed (without importing it)"""
     if import_name is None:
         import_name = package_name
     
+    # find_spec only locates the package; importing torch or ultralytics takes seconds
     try:
-        __import__(import_name)
+        found = importlib.util.find_spec(import_name) is not None
+    except (ImportError, ValueError):
+        found = False
+    
+    if found:
         print(f"{Colors.GREEN}✓{Colors.END} {package_name}")
         return True
-    except ImportError:
+    else:
         print(f"{Colors.RED}✗{Colors.END} {package_name} (not installed)")
         return False
 